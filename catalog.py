@@ -0,0 +1,148 @@
+# catalog.py
+# Offline track catalog: NumPy columns memory-mapped at startup, so genre
+# filtering and mood ranking run without loading the catalog into Python
+# objects (only the selected rows become Track records).
+#
+# Layout of a catalog directory:
+#   genres.json      genre vocabulary (at most 64 names, bit i = genres[i])
+#   ids.npy          S22     base62 Spotify track IDs
+#   genre_mask.npy   uint64  genre bitmask per track
+#   features.npy     float32 (N, 4) normalized features (see feature_index)
+#   artists.npy / titles.npy / images.npy   UTF-8 bytes, fixed width
+import json
+import random
+import threading
+from pathlib import Path
+import numpy as np
+from config import CATALOG_DIR
+from feature_index import FEATURES, TEMPO_SCALE, normalize_features, target_vector, rank_by_target
+from tracks import Track
+
+URI_PREFIX = "spotify:track:"
+MAX_GENRES = 64
+
+
+class TrackCatalog:
+    ##Read-only, memory-mapped track catalog
+
+    def __init__(self, path):
+        path = Path(path)
+        with open(path / "genres.json", encoding="utf-8") as f:
+            self.genres = json.load(f)
+        self._genre_bits = {name: np.uint64(1) << np.uint64(i) for i, name in enumerate(self.genres)}
+
+        def column(name):
+            return np.load(path / f"{name}.npy", mmap_mode="r")
+
+        self.ids = column("ids")
+        self.genre_mask = column("genre_mask")
+        self.features = column("features")
+        self.artists = column("artists")
+        self.titles = column("titles")
+        self.images = column("images")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def track(self, row) -> Track:
+        ##Materializes one row as a Track
+        return Track(
+            URI_PREFIX + self.ids[row].decode("ascii"),
+            self.artists[row].decode("utf-8"),
+            self.titles[row].decode("utf-8"),
+            self.images[row].decode("utf-8"),
+        )
+
+    def rows_for_genres(self, genres):
+        ##Row numbers of tracks tagged with any of the genres
+        bits = np.uint64(0)
+        for name in genres:
+            bits |= self._genre_bits.get(name, np.uint64(0))
+        return np.flatnonzero(self.genre_mask & bits)
+
+    def select(self, genres, params, count, variety: int = 4, exclude=None):
+        ##Tracks of the genres closest to the mood target, nearest first
+        ##The `count * variety` nearest are sampled down to `count` so repeats differ
+        ##exclude: URIs to skip (e.g. recently served); ranked only once the genres run out of others
+        rows = self.rows_for_genres(genres)
+        target = target_vector(params)
+        if exclude is not None:
+            served = np.fromiter(
+                (URI_PREFIX + self.ids[row].decode("ascii") in exclude for row in rows),
+                dtype=bool, count=len(rows)
+            )
+            fresh, seen = rows[~served], rows[served]
+            if len(fresh) < count:
+                # Every fresh track, filled up with the nearest recently served ones
+                fill = seen[rank_by_target(self.features[seen], target, count - len(fresh))]
+                picked = np.concatenate([fresh, fill])
+                order = rank_by_target(self.features[picked], target, len(picked))
+                return [self.track(int(row)) for row in picked[order]]
+            rows = fresh
+        nearest = rows[rank_by_target(self.features[rows], target, count * variety)]
+        picked = sorted(random.sample(range(len(nearest)), min(count, len(nearest))))
+        return [self.track(int(nearest[i])) for i in picked]
+
+def build_catalog(path, rows):
+    ##Writes a catalog directory from (Track, genres, raw feature row) tuples
+    ##Raw features: valence, energy, tempo (BPM), acousticness
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    rows = list(rows)
+
+    genres = sorted({g for _track, track_genres, _features in rows for g in track_genres})
+    if len(genres) > MAX_GENRES:
+        raise ValueError(f"Catalog supports at most {MAX_GENRES} genres")
+    bit = {name: 1 << i for i, name in enumerate(genres)}
+
+    def text_column(values):
+        return np.array([v.encode("utf-8") for v in values], dtype=np.bytes_)
+
+    tracks = [track for track, _genres, _features in rows]
+    np.save(path / "ids.npy", np.array([t.uri.rsplit(":", 1)[-1].encode("ascii") for t in tracks], dtype="S22"))
+    np.save(path / "genre_mask.npy", np.array([sum(bit[g] for g in set(gs)) for _t, gs, _f in rows], dtype=np.uint64))
+    np.save(path / "features.npy", normalize_features([f for _t, _g, f in rows]).reshape(-1, len(FEATURES)))
+    np.save(path / "artists.npy", text_column(t.artist for t in tracks))
+    np.save(path / "titles.npy", text_column(t.title for t in tracks))
+    np.save(path / "images.npy", text_column(t.image_url for t in tracks))
+    with open(path / "genres.json", "w", encoding="utf-8") as f:
+        json.dump(genres, f)
+
+
+def build_catalog_from_cache(path, pool_cache, feature_index):
+    ##Bulk pre-build from cached search pools + known audio features
+    ##(e.g. overnight, so generations can be served without search calls)
+    by_uri = {}
+    for (query, *_market_offset), pool in pool_cache.items():
+        query_genres = [part.split('"')[1] for part in query.split(" OR ") if '"' in part]
+        for track in pool:
+            if track.uri in feature_index:
+                entry = by_uri.setdefault(track.uri, (track, set()))
+                entry[1].update(query_genres)
+
+    rows = []
+    for uri, (track, genres) in by_uri.items():
+        row = feature_index.features[feature_index.position(uri)].astype(float)
+        row[2] *= TEMPO_SCALE   # back to BPM
+        rows.append((track, sorted(genres), row))
+    build_catalog(path, rows)
+    return len(rows)
+
+
+_catalog = None
+_catalog_loaded = False
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    ##Shared catalog mapped from CATALOG_DIR on first use (None if absent)
+    global _catalog, _catalog_loaded
+    with _catalog_lock:
+        if not _catalog_loaded:
+            _catalog_loaded = True
+            if (CATALOG_DIR / "genres.json").exists():
+                try:
+                    _catalog = TrackCatalog(CATALOG_DIR)
+                except Exception as e:
+                    print(f"Catalog load error: {e}")
+        return _catalog
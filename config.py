@@ -10,10 +10,62 @@ BASE_DIR = Path(__file__).resolve().parent
 load_dotenv(dotenv_path=BASE_DIR / ".env")
 
 # Spotify Configuration
-SCOPE = "playlist-modify-public playlist-modify-private"
+SCOPE = "playlist-modify-public playlist-modify-private user-read-private"   # user-read-private: account country
 REDIRECT_URI = os.getenv("SPOTIPY_REDIRECT_URI", "http://127.0.0.1:8888/callback")
 SPOTIPY_CLIENT_ID = os.getenv("SPOTIPY_CLIENT_ID")
 SPOTIPY_CLIENT_SECRET = os.getenv("SPOTIPY_CLIENT_SECRET")
+TOKEN_CACHE_PATH = ".spotipyoauthcache"
+TOKEN_REFRESH_MARGIN = 300   # seconds before expiry the token is refreshed in the background
+TOKEN_REDIS_URL = os.getenv("VIBE_TOKEN_REDIS_URL")   # optional: share tokens between workers
+TOKEN_REDIS_KEY = "vienna-vibe:spotify-token"
+DEFAULT_MARKET = "AT"        # search market when the account country is unknown
+SPOTIFY_SEARCH_WORKERS = 4   # process-wide cap on concurrent search calls
+SPOTIFY_SEARCH_PAGES = int(os.getenv("VIBE_SEARCH_PAGES", "1"))   # result pages (50 tracks) per genre
+SPOTIFY_POOL_TARGET = 200    # stop paging once this many unique candidates are collected
+GENERATION_WORKERS = 4       # process-wide cap on concurrent playlist generations
+GENERATION_DEBOUNCE = 1.0    # seconds a finished generation still absorbs repeat clicks
+
+# Track pool cache (search results per genre query and market)
+TRACK_CACHE_TTL = 6 * 3600
+TRACK_CACHE_MAX_ENTRIES = 256
+TRACK_CACHE_PERSIST = os.getenv("VIBE_TRACK_CACHE_PERSIST", "1") == "1"
+TRACK_CACHE_PATH = BASE_DIR / ".track_pool_cache.json"
+
+# Local audio features (uri,valence,energy,tempo,acousticness CSV), optional:
+# tracks are ranked against the mood target only when a file is configured
+TRACK_FEATURES_PATH = Path(os.environ["VIBE_TRACK_FEATURES"]) if os.getenv("VIBE_TRACK_FEATURES") else None
+
+# Track source for generation: "search" (live Spotify search) or "catalog"
+# (offline memory-mapped catalog, see catalog.py; falls back to search if absent)
+TRACK_SOURCE = os.getenv("VIBE_TRACK_SOURCE", "search")
+CATALOG_DIR = Path(os.getenv("VIBE_CATALOG_DIR", BASE_DIR / "data" / "catalog"))
+
+# Playlist per generation: "new" (default), "user" (one rolling playlist per user)
+# or "mood" (one rolling playlist per user and mood, updated in place)
+PLAYLIST_MODE = os.getenv("VIBE_PLAYLIST_MODE", "new")
+ROLLING_PLAYLISTS_PATH = BASE_DIR / ".rolling_playlists.json"
+
+# Recently served tracks per user (skipped by later generations within the window)
+HISTORY_DIR = BASE_DIR / ".vibe_history"
+HISTORY_WINDOW = 24 * 3600
+
+# Locations (name -> latitude, longitude)
+DEFAULT_LOCATION = "Vienna"
+LOCATIONS = {
+    "Vienna": (48.2085, 16.3721),
+    "Graz": (47.0707, 15.4395),
+    "Linz": (48.3064, 14.2861),
+    "Salzburg": (47.7994, 13.0440),
+    "Innsbruck": (47.2627, 11.3945),
+    "Munich": (48.1374, 11.5755),
+    "Berlin": (52.5244, 13.4105),
+    "Zurich": (47.3667, 8.5500),
+    "Prague": (50.0880, 14.4208),
+    "Budapest": (47.4980, 19.0399),
+    "Bratislava": (48.1482, 17.1067),
+    "Paris": (48.8534, 2.3488),
+    "London": (51.5085, -0.1257),
+}
 
 # UI Configuration
 WINDOW_WIDTH = 1100
@@ -22,9 +74,25 @@ MAIN_CARD_WIDTH = 360
 MAIN_CARD_HEIGHT = 600
 LEFT_PANEL_WIDTH = 320
 RIGHT_PANEL_WIDTH = 300
+RENDER_FRAME_INTERVAL = 1 / 30   # seconds; UI updates are coalesced per frame
 
 # Colors
 COLOR_SPOTIFY_GREEN = "#1DB954"
 COLOR_DARK_BG = "#000000"
 COLOR_PANEL_BG = "#111111"
-COLOR_CARD_BG = "#121212"
\ No newline at end of file
+COLOR_CARD_BG = "#121212"
+
+# Weather API Configuration
+# "json" (default) or "flatbuffers" (binary format via openmeteo_requests)
+WEATHER_BACKEND = os.getenv("VIBE_WEATHER_BACKEND", "json")
+WEATHER_CONNECT_TIMEOUT = 3.05
+WEATHER_READ_TIMEOUT = 10
+WEATHER_MAX_RETRIES = 3
+WEATHER_BACKOFF_FACTOR = 0.5
+WEATHER_BACKOFF_JITTER = 0.3
+WEATHER_POOL_SIZE = 10
+
+# Last-known-good weather store (served on cold start and when the API fails)
+WEATHER_STORE_PATH = BASE_DIR / "weather_cache.sqlite"
+WEATHER_STORE_MAX_AGE = 48 * 3600   # seconds; older snapshots are never served
+WEATHER_STALE_RETRY = 60            # seconds before retrying upstream after a failure
@@ -1,25 +1,39 @@
 
 import flet as ft
 import datetime
-from weather_logic import get_current_weather, get_forecast
+from weather_logic import get_current_weather, forecast_from_snapshot, describe_age
+from weather_async import get_weather_bundle, get_weather_snapshot
 from spotify_manager import create_spotify_playlist
+from jobs import generation_jobs
+from utils import RenderScheduler
 from ui_components import get_card_gradient, get_weather_icon, create_forecast_card, create_track_tile
 
 
 class EventHandlers:
     
-    def __init__(self, page, ui_elements, sp_client):
+    def __init__(self, page, ui_elements, spotify_session):
         
-        ##Initializes handlers with UI elements and Spotify client
+        ##Initializes handlers with UI elements and the SpotifySession
         
         self.page = page
         self.ui = ui_elements
-        self.sp_client = sp_client
+        self.spotify_session = spotify_session
+        self.render = RenderScheduler(page)   # all UI updates go through here
         
         # Application state
         self.last_weather_data = None
         self.last_tech_data = None
         self.last_preview_list = None
+        self.job = None   # running generation (jobs.Job)
+        
+        # Forecast panel view: fetched_at of the snapshot its controls were built from
+        self._forecast_key = None
+        self._forecast_age = None
+    
+    async def prefetch_weather(self):
+        ##Fetches current weather and forecast concurrently without holding a thread,
+        ##so the first generation and forecast toggle are served from the shared cache
+        await get_weather_bundle(5)
     
     def close_left_panel(self, e):
         ##Closes the left panel
@@ -27,7 +41,7 @@ class EventHandlers:
         panel.width = 0
         panel.padding = 0
         panel.opacity = 0
-        self.page.update()
+        self.render.mark(panel)
     
     def close_right_panel(self, e):
         ##Closes the right panel
@@ -35,85 +49,117 @@ class EventHandlers:
         panel.width = 0
         panel.padding = 0
         panel.opacity = 0
-        self.page.update()
+        self.render.mark(panel)
     
-    def toggle_left_panel(self, e):
-        ##Shows/hides the weather forecast panel
+    async def toggle_left_panel(self, e):
+        ##Shows/hides the weather forecast panel (runs on the event loop, so a cold
+        ##forecast is awaited without holding a handler thread)
         panel = self.ui["left_panel"]["panel"]
-        content = self.ui["left_panel"]["content"]
         
+        # Closing needs no forecast data
+        if panel.width > 0:
+            self.close_left_panel(None)
+            return
+        
+        await self.refresh_forecast_view()
+        panel.width = 320
+        panel.padding = 25
+        panel.opacity = 1
+        self.render.mark(panel)
+    
+    async def refresh_forecast_view(self):
+        ##Rebuilds the forecast controls only when the weather snapshot changed
+        ##(the snapshot is cached for an hour, so repeated opens reuse the controls)
+        content = self.ui["left_panel"]["content"]
         try:
-            forecast = get_forecast(5)
-        except Exception:
-            forecast = []
+            snapshot = await get_weather_snapshot(5)
+        except Exception as err:
+            print(f"Forecast API error: {err}")
+            snapshot = None
+        
+        if snapshot is None:
+            self._forecast_key = None
+            content.controls = [ft.Text("Forecast unavailable", color="red")]
+            return
+        
+        if snapshot['fetched_at'] == self._forecast_key:
+            self._forecast_age.value = describe_age(snapshot['fetched_at'])
+            return
         
+        forecast = forecast_from_snapshot(snapshot, 5)
         if not forecast:
+            self._forecast_key = None
             content.controls = [ft.Text("Forecast unavailable", color="red")]
-        else:
-            # Header
-            header = ft.Row([
-                ft.Text("5-Day Forecast", size=16, color="white", weight=ft.FontWeight.BOLD),
-                ft.Container(expand=True),
-                ft.Icon(ft.Icons.CALENDAR_MONTH, size=16, color="#1DB954")
-            ], alignment=ft.MainAxisAlignment.CENTER)
-            
-            # Forecast cards
-            cards = []
-            for day in forecast:
-                try:
-                    dt = datetime.datetime.fromisoformat(day.get('date'))
-                    date_label = dt.strftime('%a %d %b')
-                except:
-                    date_label = day.get('date')
-                
-                tmax = day.get('max') or 0
-                tmin = day.get('min') or 0
-                condition = day.get('condition', 'Neutral')
-                cards.append(create_forecast_card(date_label, condition, tmax, tmin))
+            return
+        
+        # Header
+        header = ft.Row([
+            ft.Text("5-Day Forecast", size=16, color="white", weight=ft.FontWeight.BOLD),
+            ft.Container(expand=True),
+            ft.Icon(ft.Icons.CALENDAR_MONTH, size=16, color="#1DB954")
+        ], alignment=ft.MainAxisAlignment.CENTER)
+        age_text = ft.Text(describe_age(snapshot['fetched_at']), size=10, color="grey", italic=True)
+        
+        # Forecast cards
+        cards = []
+        for day in forecast:
+            try:
+                dt = datetime.datetime.fromisoformat(day.get('date'))
+                date_label = dt.strftime('%a %d %b')
+            except:
+                date_label = day.get('date')
             
-            content.controls = [
-                header,
-                ft.Container(height=10),
-                ft.Column(cards, spacing=10, scroll=ft.ScrollMode.AUTO, expand=True)
-            ]
+            tmax = day.get('max') or 0
+            tmin = day.get('min') or 0
+            condition = day.get('condition', 'Neutral')
+            cards.append(create_forecast_card(date_label, condition, tmax, tmin))
         
-        # Toggle visibility
-        if panel.width > 0:
-            self.close_left_panel(None)
-        else:
-            panel.width = 320
-            panel.padding = 25
-            panel.opacity = 1
-            self.page.update()
+        content.controls = [
+            header,
+            age_text,
+            ft.Container(height=10),
+            ft.Column(cards, spacing=10, scroll=ft.ScrollMode.AUTO, expand=True)
+        ]
+        self._forecast_key = snapshot['fetched_at']
+        self._forecast_age = age_text
     
-    def toggle_right_panel(self, e):
-        """Shows/hides the tracks panel"""
-        panel = self.ui["right_panel"]["panel"]
+    def render_preview(self):
+        ##Fills the tracks panel from last_preview_list
         content = self.ui["right_panel"]["content"]
-        
         if not self.last_preview_list:
             content.controls = [ft.Text("Generate first!", color="red")]
         else:
-            tracks_ui = []
-            for i, raw_track in enumerate(self.last_preview_list):
-                try:
-                    artist, title, img_url = raw_track.split("|")
-                    tracks_ui.append(create_track_tile(i+1, artist, title, img_url))
-                except:
-                    pass
-            content.controls = tracks_ui
+            content.controls = [
+                create_track_tile(i+1, track.artist, track.title, track.image_url)
+                for i, track in enumerate(self.last_preview_list)
+            ]
+    
+    def open_right_panel(self):
+        ##Opens the tracks panel
+        panel = self.ui["right_panel"]["panel"]
+        panel.width = 300
+        panel.padding = 25
+        panel.opacity = 1
+        self.render.mark(panel)
+    
+    def toggle_right_panel(self, e):
+        """Shows/hides the tracks panel"""
+        panel = self.ui["right_panel"]["panel"]
+        self.render_preview()
         
         # Toggle visibilité
         if panel.width > 0:
             self.close_right_panel(None)
         else:
-            panel.width = 300
-            panel.padding = 25
-            panel.opacity = 1
-            self.page.update()
+            self.open_right_panel()
     
     def handle_reset(self, e):
         ##Resets the application to its initial state
+        # Abort the running generation
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+        
         # Reset state
         self.last_weather_data = None
         self.last_tech_data = None
@@ -146,7 +192,7 @@ class EventHandlers:
         gen_btn.text = "GENERATE VIBE"
         gen_btn.disabled = False
         
-        self.page.update()
+        self.render.mark(main_card["card"])
     
     def update_weather_display(self):
         ##Updates the weather display
@@ -164,9 +210,13 @@ class EventHandlers:
         
         # Update text
         main_card["weather_temp"].value = f"{self.last_weather_data['temperature']:.0f}°"
-        main_card["weather_desc"].value = f"{cond} | {self.last_weather_data['wind_speed']} km/h"
+        desc = f"{cond} | {self.last_weather_data['wind_speed']} km/h"
+        age = describe_age(self.last_weather_data.get('fetched_at'))
+        if age:
+            desc += f" · {age}"
+        main_card["weather_desc"].value = desc
         
-        self.page.update()
+        self.render.mark(main_card["card"])
     
     def toggle_theme(self, e):
         ##Toggles between light and dark theme
@@ -183,21 +233,27 @@ class EventHandlers:
         self.ui["main_card"]["title_text_2"].color = text_col
         
         self.page.appbar.bgcolor = "#F0F0F0" if is_dark else "#121212"
-        self.page.update()
+        self.render.mark_page()
+    
+    def _job_key(self):
+        ##Generations are debounced per Spotify user (all tabs), per page when offline
+        try:
+            return self.spotify_session.user_id
+        except Exception:
+            return id(self)
     
     def on_generate_click(self, e):
-        ##Generates a new playlist based on weather
+        ##Starts playlist generation in the background (or joins the user's running one)
         main_card = self.ui["main_card"]
         gen_btn = main_card["gen_btn"]
         progress = main_card["progress"]
         status_container = main_card["status_container"]
-        status_text = main_card["status_text"]
-        status_icon = main_card["status_icon"]
         playlist_link = main_card["playlist_link"]
         
         # Update UI - start process
         gen_btn.text = "SCANNING..."
         gen_btn.disabled = True
+        progress.value = None
         progress.visible = True
         playlist_link.visible = False
         status_container.visible = False
@@ -206,45 +262,98 @@ class EventHandlers:
         self.close_left_panel(None)
         self.close_right_panel(None)
         
-        self.page.update()
+        self.render.mark(main_card["card"])
         
-        try:
-            # Get weather
-            self.last_weather_data = get_current_weather()
+        job, _started = generation_jobs.submit(self._job_key(), self._generate)
+        self.job = job
+        job.add_listener(self._on_job_progress)
+        job.add_done_callback(self._on_job_done)
+    
+    def _generate(self, job):
+        ##Job body, runs on the generation executor: weather, then playlist
+        ##Each stage result is reported as an event and rendered by _on_job_progress
+        job.report("Reading weather...", 0.1)
+        weather = get_current_weather()
+        job.check()
+        job.report("Weather ready", 0.2, "weather", weather)
+        
+        result = create_spotify_playlist(
+            weather,
+            self.spotify_session,
+            cancel=job.cancel_event,
+            progress=job.report
+        )
+        return weather, result
+    
+    def _on_job_progress(self, job, event, data):
+        ##Shows the stage of the running generation and renders stage results as they arrive
+        if job is not self.job:
+            return
+        main_card = self.ui["main_card"]
+        main_card["gen_btn"].text = job.stage.upper()
+        main_card["progress"].value = job.progress
+        
+        if event == "weather":
+            self.last_weather_data = data
             self.update_weather_display()
-            
-            # Create playlist
-            msg, url, tech, preview = create_spotify_playlist(
-                self.last_weather_data,
-                self.sp_client
-            )
-            
-            self.last_tech_data = tech
-            self.last_preview_list = preview
-            progress.visible = False
-            
-            # Update UI - result
-            if url:
-                status_text.value = msg
-                status_icon.name = ft.Icons.CHECK_CIRCLE
-                status_container.bgcolor = "#1DB954"
-                status_container.visible = True
-                playlist_link.url = url
-                playlist_link.visible = True
-            else:
-                status_text.value = msg
-                status_icon.name = ft.Icons.ERROR
-                status_container.bgcolor = "red"
-                status_container.visible = True
+        elif event == "preview":
+            # Tracks are known: show them while the playlist is still being written
+            self.last_tech_data = data["tech"]
+            self.last_preview_list = data["preview"]
+            self.render_preview()
+            self.open_right_panel()
+        elif event == "playlist":
+            self.show_playlist_link(data["message"], data["url"])
         
-        except Exception as err:
-            print(f"Generation error: {err}")
+        self.render.mark(main_card["card"])
+    
+    def show_playlist_link(self, msg, url):
+        ##Status line + link to the playlist (error status without url)
+        main_card = self.ui["main_card"]
+        status_container = main_card["status_container"]
+        status_text = main_card["status_text"]
+        status_icon = main_card["status_icon"]
+        playlist_link = main_card["playlist_link"]
+        
+        status_text.value = msg
+        status_container.visible = True
+        if url:
+            status_icon.name = ft.Icons.CHECK_CIRCLE
+            status_container.bgcolor = "#1DB954"
+            playlist_link.url = url
+            playlist_link.visible = True
+        else:
+            status_icon.name = ft.Icons.ERROR
+            status_container.bgcolor = "red"
+    
+    def _on_job_done(self, job):
+        ##Renders the generation result (ignored if replaced); a job cancelled from another
+        ##tab only restores the button
+        if job is not self.job:
+            return
+        self.job = None
+        
+        main_card = self.ui["main_card"]
+        gen_btn = main_card["gen_btn"]
+        progress = main_card["progress"]
+        status_container = main_card["status_container"]
+        status_text = main_card["status_text"]
+        
+        if job.outcome == "failed":
+            print(f"Generation error: {job.error}")
             status_text.value = "Error"
             status_container.bgcolor = "red"
             status_container.visible = True
+        elif job.outcome == "completed":
+            # Stages already rendered by _on_job_progress; errors end the pipeline without one
+            _weather, (msg, url, tech, preview) = job.result
+            self.last_tech_data = tech
+            self.last_preview_list = preview
+            if not url:
+                self.show_playlist_link(msg, url)
         
         # Restore button
         gen_btn.text = "GENERATE VIBE"
         gen_btn.disabled = False
         progress.visible = False
-        self.page.update()
\ No newline at end of file
+        self.render.mark(main_card["card"])
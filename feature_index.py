@@ -0,0 +1,104 @@
+# feature_index.py
+# Local audio-feature index: ranks tracks by distance to the mood target
+# (valence, energy, tempo, acousticness) in one vectorized NumPy query.
+#
+# Source file (CSV, one row per track):
+#   uri,valence,energy,tempo,acousticness
+#   spotify:track:...,0.61,0.72,118.0,0.12
+import csv
+import threading
+import numpy as np
+from config import TRACK_FEATURES_PATH
+
+FEATURES = ("valence", "energy", "tempo", "acousticness")
+TEMPO_SCALE = 200.0   # BPM -> roughly [0, 1], same scale as the other features
+
+
+def normalize_features(values):
+    ##Raw feature rows (N, 4) -> new float32 matrix with tempo rescaled (input is never modified)
+    matrix = np.array(values, dtype=np.float32).reshape(-1, len(FEATURES))
+    matrix[:, 2] /= TEMPO_SCALE
+    return matrix
+
+
+def target_vector(params):
+    ##Mood target from map_weather_to_spotify params, normalized like the index
+    return normalize_features([[
+        params.get("target_valence", 0.5),
+        params.get("target_energy", 0.5),
+        params.get("target_tempo", 110),
+        params.get("target_acousticness", 0.2),
+    ]])[0]
+
+
+def rank_by_target(features, target, count):
+    ##Row indices of the `count` rows closest to target (squared Euclidean), nearest first
+    if len(features) == 0 or count <= 0:
+        return np.empty(0, dtype=np.intp)
+    distances = np.square(features - target).sum(axis=1)
+    if count < len(distances):
+        nearest = np.argpartition(distances, count - 1)[:count]
+    else:
+        nearest = np.arange(len(distances))
+    return nearest[np.argsort(distances[nearest], kind="stable")]
+
+
+class TrackFeatureIndex:
+    ##Feature vectors of known tracks, stored as one (N, 4) float32 matrix
+
+    def __init__(self, uris, features):
+        self.uris = list(uris)
+        self.features = normalize_features(features)
+        if len(self.uris) != len(self.features):
+            raise ValueError("uris and features must have the same length")
+        self._positions = {uri: i for i, uri in enumerate(self.uris)}
+
+    @classmethod
+    def from_csv(cls, path):
+        ##Loads a uri,valence,energy,tempo,acousticness CSV file
+        uris, rows = [], []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                uris.append(row["uri"])
+                rows.append([float(row[name]) for name in FEATURES])
+        return cls(uris, rows)
+
+    def __len__(self):
+        return len(self.uris)
+
+    def __contains__(self, uri):
+        return uri in self._positions
+
+    def position(self, uri) -> int:
+        ##Row of a URI in the feature matrix (KeyError if absent)
+        return self._positions[uri]
+
+    def nearest(self, params, count, candidates=None):
+        ##URIs of the `count` tracks closest to the mood target, nearest first
+        ##candidates: optional list of URIs to rank instead of the whole index
+        if candidates is None:
+            return [self.uris[i] for i in rank_by_target(self.features, target_vector(params), count)]
+
+        known = [uri for uri in candidates if uri in self._positions]
+        rows = self.features[[self._positions[uri] for uri in known]]
+        return [known[i] for i in rank_by_target(rows, target_vector(params), count)]
+
+
+_index = None
+_index_loaded = False
+_index_lock = threading.Lock()
+
+
+def get_feature_index():
+    ##Shared index loaded from TRACK_FEATURES_PATH on first use (None if unset or absent)
+    global _index, _index_loaded
+    with _index_lock:
+        if not _index_loaded:
+            _index_loaded = True
+            if TRACK_FEATURES_PATH and TRACK_FEATURES_PATH.exists():
+                try:
+                    _index = TrackFeatureIndex.from_csv(TRACK_FEATURES_PATH)
+                except Exception as e:
+                    print(f"Feature index load error: {e}")
+        return _index
+
@@ -0,0 +1,128 @@
+# history.py
+# Per-user "recently served" filter so repeat generations avoid tracks the user
+# already got. Track IDs are decoded from base62 to 128-bit ints and stored in
+# time-bucketed Bloom filters (sliding window): 4 KB per bucket, ~0.2% false
+# positives at 2000 tracks per bucket.
+import base64
+import json
+import re
+import threading
+import time
+from config import HISTORY_DIR, HISTORY_WINDOW
+
+BASE62 = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_BASE62_VALUE = {c: i for i, c in enumerate(BASE62)}
+_MASK64 = (1 << 64) - 1
+
+
+def track_id_to_int(uri: str) -> int:
+    ##"spotify:track:<base62 id>" (or the bare id) -> 128-bit int
+    value = 0
+    for c in uri.rsplit(":", 1)[-1]:
+        value = value * 62 + _BASE62_VALUE[c]
+    return value & ((1 << 128) - 1)
+
+
+class RecentlyPlayed:
+    ##Sliding-window Bloom filter: `buckets` filters of `bits` bits, each covering window/buckets seconds
+
+    def __init__(self, path=None, window: float = HISTORY_WINDOW, buckets: int = 4, bits: int = 32768, hashes: int = 4):
+        self.path = path
+        self.window = window
+        self.span = window / buckets
+        self.buckets = buckets
+        self.bits = bits
+        self.hashes = hashes
+        self._filters = []   # [(start_time, bytearray)], oldest first
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+
+    def _positions(self, uri):
+        # Double hashing on the two 64-bit halves of the decoded ID
+        value = track_id_to_int(uri)
+        h1, h2 = value & _MASK64, (value >> 64) | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def _expire(self, now):
+        self._filters = [(start, f) for start, f in self._filters if now - start < self.window]
+
+    def add(self, uris):
+        ##Remembers served track URIs
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            if not self._filters or now - self._filters[-1][0] >= self.span:
+                self._filters.append((now, bytearray(self.bits // 8)))
+            current = self._filters[-1][1]
+            for uri in uris:
+                try:
+                    positions = self._positions(uri)
+                except KeyError:
+                    continue   # not a base62 track id
+                for p in positions:
+                    current[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, uri):
+        ##True if the URI was (probably) served within the window
+        try:
+            positions = self._positions(uri)
+        except KeyError:
+            return False
+        now = time.time()
+        with self._lock:
+            for start, f in self._filters:
+                if now - start < self.window and all(f[p >> 3] & (1 << (p & 7)) for p in positions):
+                    return True
+        return False
+
+    def save(self):
+        ##Writes the live buckets to disk
+        if not self.path:
+            return
+        with self._lock:
+            self._expire(time.time())
+            data = {
+                "bits": self.bits,
+                "hashes": self.hashes,
+                "filters": [[start, base64.b64encode(bytes(f)).decode("ascii")] for start, f in self._filters],
+            }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as fh:
+                json.dump(data, fh)
+        except Exception as e:
+            print(f"History save error: {e}")
+
+    def load(self):
+        ##Reads buckets saved earlier (ignored if the filter geometry changed)
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"History load error: {e}")
+            return
+        if data.get("bits") != self.bits or data.get("hashes") != self.hashes:
+            return
+        with self._lock:
+            self._filters = [(start, bytearray(base64.b64decode(f))) for start, f in data.get("filters", [])]
+            self._expire(time.time())
+
+
+_histories = {}
+_histories_lock = threading.Lock()
+
+
+def get_history(user_id):
+    ##Shared RecentlyPlayed of a user, persisted under HISTORY_DIR (None without a user id)
+    if not user_id:
+        return None
+    with _histories_lock:
+        history = _histories.get(user_id)
+        if history is None:
+            safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", str(user_id))
+            history = RecentlyPlayed(path=HISTORY_DIR / f"{safe_id}.json")
+            _histories[user_id] = history
+        return history
@@ -0,0 +1,162 @@
+# jobs.py
+# Background generation jobs: a bounded, process-wide executor keeps slow
+# Spotify work off the Flet event handlers. One job per key (user) is active
+# at a time, so repeat clicks from several tabs join the running job instead
+# of starting another one. Jobs report progress and stage events (with their
+# results, so the UI can render each one as it arrives) and can be cancelled.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import GENERATION_WORKERS, GENERATION_DEBOUNCE
+from metrics import LatencyStats, EventCounter
+
+
+class JobCancelled(Exception):
+    ##Raised by Job.check() once the job has been cancelled
+    pass
+
+
+class Job:
+    ##One background run: cancellation flag, progress, listeners and outcome
+
+    def __init__(self, key):
+        self.key = key
+        self.cancel_event = threading.Event()
+        self.stage = "Queued"
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.outcome = None          # "completed", "cancelled" or "failed" once done
+        self.finished_at = None
+        self.events = []             # [(event, data)] reported so far
+        self._listeners = []
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        ##Asks the job to stop at its next check (queued jobs do not start)
+        self.cancel_event.set()
+
+    def check(self):
+        ##Raises JobCancelled if the job was cancelled
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def done(self) -> bool:
+        return self.outcome is not None
+
+    def report(self, stage: str, progress: float, event=None, data=None):
+        ##Publishes progress (0..1) to the listeners, optionally with a stage event
+        ##(e.g. "weather", "preview") and its result
+        with self._lock:
+            self.stage = stage
+            self.progress = progress
+            if event is not None:
+                self.events.append((event, data))
+            listeners = list(self._listeners)
+        for listener in listeners:
+            self._call(listener, event, data)
+
+    def add_listener(self, fn):
+        ##fn(job, event, data) on every report; events reported earlier are replayed first
+        with self._lock:
+            self._listeners.append(fn)
+            past = list(self.events)
+        for event, data in past:
+            self._call(fn, event, data)
+
+    def add_done_callback(self, fn):
+        ##fn(job) once the job is done (immediately if it already is)
+        with self._lock:
+            if self.outcome is None:
+                self._callbacks.append(fn)
+                return
+        self._call(fn)
+
+    def _finish(self, outcome, result=None, error=None):
+        with self._lock:
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            self.outcome = outcome
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            self._call(fn)
+
+    def _call(self, fn, *args):
+        try:
+            fn(self, *args)
+        except Exception as e:
+            print(f"Job callback error: {e}")
+
+
+class JobRunner:
+    ##Bounded executor for jobs, at most one active job per key
+
+    def __init__(self, max_workers: int = GENERATION_WORKERS, debounce: float = GENERATION_DEBOUNCE):
+        self.max_workers = max_workers
+        self.debounce = debounce
+        self.latency = LatencyStats()
+        self.outcomes = EventCounter()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="generate")
+        self._jobs = {}   # key -> latest job
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+
+    def submit(self, key, fn, *args):
+        ##Runs fn(job, *args) in the background; returns (job, started)
+        ##A job of the same key still running (or finished less than `debounce` seconds ago)
+        ##is returned instead of starting a new one
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not job.cancelled and (
+                not job.done() or time.time() - job.finished_at < self.debounce
+            ):
+                self.outcomes.incr("debounced")
+                return job, False
+            job = Job(key)
+            self._jobs[key] = job
+            self._queued += 1
+        self._executor.submit(self._run, job, fn, args)
+        return job, True
+
+    def _run(self, job, fn, args):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        start = time.perf_counter()
+        outcome, result, error = "completed", None, None
+        try:
+            job.check()
+            result = fn(job, *args)
+            if job.cancelled:
+                outcome = "cancelled"
+        except JobCancelled:
+            outcome = "cancelled"
+        except Exception as e:
+            print(f"Job error: {e}")
+            outcome, error = "failed", e
+        with self._lock:
+            self._running -= 1
+            if self._jobs.get(job.key) is job and outcome == "cancelled":
+                del self._jobs[job.key]
+        self.latency.record(time.perf_counter() - start, ok=outcome != "failed")
+        self.outcomes.incr(outcome)
+        job._finish(outcome, result, error)
+
+    def stats(self) -> dict:
+        ##Running/queued gauges, outcome counts and job latency
+        with self._lock:
+            stats = {"max_workers": self.max_workers, "running": self._running, "queued": self._queued}
+        stats.update(self.outcomes.snapshot())
+        stats["latency"] = self.latency.snapshot()
+        return stats
+
+
+# Process-wide runner for playlist generation (all sessions)
+generation_jobs = JobRunner()
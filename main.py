@@ -1,6 +1,6 @@
 import flet as ft
 from config import WINDOW_WIDTH, WINDOW_HEIGHT, COLOR_DARK_BG
-from spotify_manager import initialize_spotify_client, get_user_info
+from spotify_manager import initialize_spotify_session, get_user_info
 from splash_screen import show_splash_with_connection
 from ui_components import create_main_card, create_side_panel
 from event_handlers import EventHandlers
@@ -22,14 +22,14 @@ def main(page: ft.Page):
     def connection_callback():
         ##Handles Spotify connection
         try:
-            sp_client = initialize_spotify_client()
-            user_name, user_id = get_user_info(sp_client)
-            return True, user_name, sp_client
+            spotify_session = initialize_spotify_session()
+            user_name, user_id = get_user_info(spotify_session)
+            return True, user_name, spotify_session
         except Exception as e:
             print(f"Connection error: {e}")
             return False, "Guest", None
     
-    user_name, sp_client = show_splash_with_connection(page, connection_callback)
+    user_name, spotify_session = show_splash_with_connection(page, connection_callback)
     
     # CREATE UI ELEMENTS
     
@@ -49,7 +49,7 @@ def main(page: ft.Page):
     
     # EVENT HANDLERS
     
-    event_handlers = EventHandlers(page, ui_elements, sp_client)
+    event_handlers = EventHandlers(page, ui_elements, spotify_session)
     
     # Connect panel events
     left_panel_elements["close_btn"].on_click = event_handlers.close_left_panel
@@ -58,10 +58,16 @@ def main(page: ft.Page):
     # Connect main button event
     main_card_elements["gen_btn"].on_click = event_handlers.on_generate_click
     
+    # Warm the weather cache off the handler threads
+    page.run_task(event_handlers.prefetch_weather)
+    
     # CLOCK
     
     clock_manager = ClockManager(page)
     clock_manager.start()
+    page.on_disconnect = lambda e: clock_manager.stop()   # tab closed or connection lost
+    page.on_connect = lambda e: clock_manager.start()      # same session reconnected
+    page.on_close = lambda e: clock_manager.stop()        # session expired
     
     # APPLICATION BAR 
     
@@ -0,0 +1,97 @@
+"""
+Lightweight in-process counters (call counts, errors, latency percentiles)
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class LatencyStats:
+    ##Thread-safe call counter keeping a rolling window of latencies
+
+    def __init__(self, window: int = 512):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float, ok: bool = True):
+        ##Adds one call duration (seconds)
+        with self._lock:
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self._samples.append(seconds)
+
+    @contextmanager
+    def measure(self):
+        ##Times the enclosed block; exceptions are counted as errors and re-raised
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(time.perf_counter() - start, ok)
+
+    def percentile(self, pct: float) -> float:
+        ##Nearest-rank percentile over the rolling window (seconds)
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        rank = max(0, min(len(samples) - 1, int(round(pct / 100 * len(samples))) - 1))
+        return samples[rank]
+
+    def snapshot(self) -> dict:
+        ##Returns the counters in milliseconds, ready to log or display
+        with self._lock:
+            calls, errors = self.calls, self.errors
+            avg = self.total_seconds / calls if calls else 0.0
+            peak = self.max_seconds
+        return {
+            "calls": calls,
+            "errors": errors,
+            "avg_ms": round(avg * 1000, 1),
+            "p50_ms": round(self.percentile(50) * 1000, 1),
+            "p95_ms": round(self.percentile(95) * 1000, 1),
+            "p99_ms": round(self.percentile(99) * 1000, 1),
+            "max_ms": round(peak * 1000, 1),
+        }
+
+    def reset(self):
+        ##Clears all counters
+        with self._lock:
+            self._samples.clear()
+            self.calls = 0
+            self.errors = 0
+            self.total_seconds = 0.0
+            self.max_seconds = 0.0
+
+
+class EventCounter:
+    ##Thread-safe named counters (e.g. errors by exception type)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def incr(self, name: str, amount: int = 1):
+        ##Adds amount to the named counter
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def snapshot(self) -> dict:
+        ##Returns a copy of all counters
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        ##Clears all counters
+        with self._lock:
+            self._counts.clear()
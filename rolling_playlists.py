@@ -0,0 +1,130 @@
+# rolling_playlists.py
+# One reusable playlist per user (or per user and mood) instead of a new
+# playlist per generation. The playlist ids live in a small JSON file, and
+# updates send only the write calls needed to turn the current contents into
+# the new track list (Spotify accepts at most 100 items per call).
+import json
+import os
+import threading
+from spotipy.exceptions import SpotifyException
+
+CHUNK_SIZE = 100
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def playlist_key(user_id, mood, mode):
+    ##Store key of the rolling playlist for "user" or "mood" mode
+    return f"{user_id}:{mood}" if mode == "mood" else str(user_id)
+
+
+class RollingPlaylistStore:
+    ##key -> playlist id, persisted as JSON
+
+    def __init__(self, path):
+        self.path = path
+        self._ids = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.load()
+
+    def get(self, key):
+        with self._lock:
+            return self._ids.get(key)
+
+    def set(self, key, playlist_id):
+        with self._lock:
+            self._ids[key] = playlist_id
+        self.save()
+
+    def save(self):
+        ##Writes the ids to a temp file and swaps it in (one writer at a time, so the
+        ##latest ids always land last and readers never see a partial file)
+        with self._write_lock:
+            with self._lock:
+                data = dict(self._ids)
+            tmp = f"{self.path}.tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp, self.path)
+            except Exception as e:
+                print(f"Rolling playlist save error: {e}")
+
+    def forget(self, key):
+        with self._lock:
+            self._ids.pop(key, None)
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._ids = dict(json.load(f))
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Rolling playlist load error: {e}")
+
+
+def get_playlist_uris(sp_client, playlist_id):
+    ##Current track URIs of a playlist, in order
+    uris = []
+    page = sp_client.playlist_items(playlist_id, fields="items(track(uri)),next", limit=CHUNK_SIZE)
+    while page:
+        uris.extend(item["track"]["uri"] for item in page["items"] if item.get("track"))
+        page = sp_client.next(page) if page.get("next") else None
+    return uris
+
+
+def sync_playlist(sp_client, playlist_id, uris, current=None):
+    ##Makes the playlist contain exactly `uris`, in order
+    ##Returns the number of write calls sent (0 if nothing changed)
+    if current is None:
+        current = get_playlist_uris(sp_client, playlist_id)
+    if current == uris:
+        return 0
+
+    wanted = set(uris)
+    # Only new tracks appended at the end
+    if uris[:len(current)] == current:
+        tail = _chunks(uris[len(current):])
+        for chunk in tail:
+            sp_client.playlist_add_items(playlist_id, chunk)
+        return len(tail)
+
+    # Only tracks removed, order of the rest unchanged
+    if wanted.issubset(current) and [u for u in current if u in wanted] == uris:
+        removed = _chunks(list(dict.fromkeys(u for u in current if u not in wanted)))
+        for chunk in removed:
+            sp_client.playlist_remove_all_occurrences_of_items(playlist_id, chunk)
+        return len(removed)
+
+    # Anything else: replace with the first chunk, append the rest
+    chunks = _chunks(uris) or [[]]
+    sp_client.playlist_replace_items(playlist_id, chunks[0])
+    for chunk in chunks[1:]:
+        sp_client.playlist_add_items(playlist_id, chunk)
+    return len(chunks)
+
+
+def update_rolling_playlist(sp_client, store, key, uris, create):
+    ##Syncs the stored playlist of `key` to `uris`
+    ##create(): makes a new playlist and returns the Spotify playlist object (used when
+    ##none is stored or the stored one is gone)
+    ##Returns (playlist_id, url, reused)
+    playlist_id = store.get(key)
+    if playlist_id:
+        try:
+            sync_playlist(sp_client, playlist_id, uris)
+            return playlist_id, f"https://open.spotify.com/playlist/{playlist_id}", True
+        except SpotifyException as e:
+            if e.http_status != 404:
+                raise
+            store.forget(key)
+
+    playlist = create()
+    for chunk in _chunks(uris):
+        sp_client.playlist_add_items(playlist["id"], chunk)
+    store.set(key, playlist["id"])
+    return playlist["id"], playlist["external_urls"]["spotify"], False
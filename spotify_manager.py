@@ -1,99 +1,279 @@
 import spotipy
-from spotipy.oauth2 import SpotifyOAuth, CacheFileHandler
+from spotipy.oauth2 import SpotifyOAuth
 import random
-from config import SCOPE, REDIRECT_URI, SPOTIPY_CLIENT_ID, SPOTIPY_CLIENT_SECRET
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from config import (
+    SCOPE, REDIRECT_URI, SPOTIPY_CLIENT_ID, SPOTIPY_CLIENT_SECRET, SPOTIFY_SEARCH_WORKERS, TRACK_SOURCE,
+    SPOTIFY_SEARCH_PAGES, SPOTIFY_POOL_TARGET,
+    TRACK_CACHE_TTL, TRACK_CACHE_MAX_ENTRIES, TRACK_CACHE_PERSIST, TRACK_CACHE_PATH,
+    PLAYLIST_MODE, ROLLING_PLAYLISTS_PATH, DEFAULT_MARKET
+)
 from weather_logic import map_weather_to_spotify, MOOD_TO_SPOTIFY
+from metrics import LatencyStats, EventCounter
+from track_cache import TrackPoolCache
+from tracks import Track, TrackPool
+from feature_index import get_feature_index
+from catalog import get_catalog
+from history import get_history
+from token_cache import get_token_cache, start_token_refresher
+from rolling_playlists import RollingPlaylistStore, playlist_key, update_rolling_playlist
+
+# Shared, bounded pool for Spotify search fan-out (all sessions)
+_search_pool = ThreadPoolExecutor(max_workers=SPOTIFY_SEARCH_WORKERS, thread_name_prefix="spotify-search")
+
+SEARCH_PAGE_SIZE = 50       # Spotify search maximum per request
+MAX_SEARCH_OFFSET = 1000     # Spotify search does not page beyond this
+
+search_latency = LatencyStats()
+search_errors = EventCounter()
+
+# Candidate pools per (query, market, offset): repeat generations need no search call
+track_pool_cache = TrackPoolCache(
+    max_entries=TRACK_CACHE_MAX_ENTRIES,
+    ttl=TRACK_CACHE_TTL,
+    path=TRACK_CACHE_PATH if TRACK_CACHE_PERSIST else None
+)
+
+# Playlist ids reused by the "user" and "mood" playlist modes
+rolling_playlists = RollingPlaylistStore(ROLLING_PLAYLISTS_PATH)
 
 
 def initialize_spotify_client():
     
     ##Initializes and returns an authenticated Spotify client
+    ##The token comes from the shared in-memory cache and is refreshed ahead of expiry
     
-    handler = CacheFileHandler(cache_path=".spotipyoauthcache")
-    sp = spotipy.Spotify(
-        auth_manager=SpotifyOAuth(
-            client_id=SPOTIPY_CLIENT_ID,
-            client_secret=SPOTIPY_CLIENT_SECRET,
-            redirect_uri=REDIRECT_URI,
-            scope=SCOPE,
-            cache_handler=handler
-        )
+    auth_manager = SpotifyOAuth(
+        client_id=SPOTIPY_CLIENT_ID,
+        client_secret=SPOTIPY_CLIENT_SECRET,
+        redirect_uri=REDIRECT_URI,
+        scope=SCOPE,
+        cache_handler=get_token_cache()
     )
+    sp = spotipy.Spotify(auth_manager=auth_manager)
+    start_token_refresher(auth_manager)
     return sp
 
 
-def get_user_info(sp_client):
+class SpotifySession:
+    
+    ##One connected user: the spotipy client, the profile (fetched once with me())
+    ##and the caches/counters the generation path uses (process-wide ones by default)
+    
+    def __init__(self, client, track_cache=None, latency=None, errors=None, playlists=None):
+        self.client = client
+        self.track_cache = track_pool_cache if track_cache is None else track_cache
+        self.search_latency = search_latency if latency is None else latency
+        self.search_errors = search_errors if errors is None else errors
+        self.rolling_playlists = rolling_playlists if playlists is None else playlists
+        self._profile = None
+        self._lock = threading.Lock()
     
-    ## Retrieves information for the connected user
+    @property
+    def profile(self) -> dict:
+        ##Memoized me() response (raises if it cannot be fetched; retried on next access)
+        with self._lock:
+            if self._profile is None:
+                self._profile = self.client.me()
+            return self._profile
+    
+    @property
+    def user_id(self):
+        return self.profile["id"]
+    
+    @property
+    def display_name(self):
+        return self.profile.get("display_name") or "Music Lover"
+    
+    @property
+    def market(self):
+        ##Search market from the account country (needs user-read-private), else DEFAULT_MARKET
+        try:
+            return self.profile.get("country") or DEFAULT_MARKET
+        except Exception:
+            return DEFAULT_MARKET
+    
+    @property
+    def history(self):
+        ##Recently served tracks of this user
+        return get_history(self.user_id)
+
+
+def initialize_spotify_session():
     
+    ##Authenticated client wrapped in a SpotifySession
+    
+    return SpotifySession(initialize_spotify_client())
+
+
+def _as_session(sp):
+    return sp if isinstance(sp, SpotifySession) else SpotifySession(sp)
+
+
+def get_user_info(session):
+    
+    ## Retrieves information for the connected user (memoized by the session)
+    
+    session = _as_session(session)
     try:
-        user_data = sp_client.me()
-        return user_data.get('display_name', 'Music Lover'), user_data.get('id')
+        return session.display_name, session.user_id
     except Exception as e:
         print(f"Error fetching user info: {e}")
         return "Guest", None
 
 
-def get_tracks_for_mood_via_search(sp_client, mood: str, desired_count: int = 25, market: str = "AT"):
+def _search_tracks(session, query, market, offset=0):
+    
+    ## One search call (one page); the pool is cached, failures are counted (search_errors) and yield no tracks
+    
+    try:
+        with session.search_latency.measure():
+            results = session.client.search(q=query, type="track", limit=SEARCH_PAGE_SIZE, offset=offset, market=market)
+    except Exception as e:
+        session.search_errors.incr(type(e).__name__)
+        return []
+    items = results.get("tracks", {}).get("items", [])
+    tracks = TrackPool(Track.from_api(t) for t in items if t and t.get("uri"))
+    session.track_cache.put((query, market, offset), tracks)
+    return tracks
+
+
+def _submit_search(session, query, market, offset=0):
+    
+    ## Cached pool as a completed future, otherwise a search on the shared pool
+    
+    cached = session.track_cache.get((query, market, offset))
+    if cached is not None:
+        future = Future()
+        future.set_result(cached)
+        return future
+    return _search_pool.submit(_search_tracks, session, query, market, offset)
+
+
+def get_search_stats():
+    
+    ## Latency percentiles and error counts of Spotify search calls
+    
+    stats = search_latency.snapshot()
+    stats["errors_by_type"] = search_errors.snapshot()
+    stats["cache"] = track_pool_cache.stats()
+    return stats
+
+
+def get_tracks_for_mood_via_search(session, mood: str, desired_count: int = 25, market: str = None, target=None,
+                                   exclude=None, pages: int = SPOTIFY_SEARCH_PAGES, pool_size: int = SPOTIFY_POOL_TARGET):
     
     ## Searches for Spotify tracks based on a given mood
+    ## Per-genre searches and the combined OR query run concurrently (or come from the session's track cache)
+    ## market: defaults to the session's market (account country)
+    ## pages: result pages per genre (50 tracks each), all requested at once; pages are merged
+    ## as they arrive and the rest is dropped once pool_size unique tracks are collected
+    ## target: map_weather_to_spotify params; when a local feature index is available,
+    ## the tracks closest to it come first and the rest is filled at random
+    ## exclude: recently served URIs (e.g. history.RecentlyPlayed); used only to fill up
+    ## when there are not enough other tracks
+    ## Returns a list of Track records
     
+    session = _as_session(session)
+    market = market or session.market
     cfg = MOOD_TO_SPOTIFY.get(mood, MOOD_TO_SPOTIFY["Neutral"])
     genres = cfg["seed_genres"]
-    all_tracks = []
+    genre_queries = [f'genre:"{g}"' for g in genres]
     
-    # Search by individual genre
-    for genre in genres:
-        try:
-            results = sp_client.search(q=f'genre:"{genre}"', type="track", limit=50, market=market)
-            items = results.get("tracks", {}).get("items", [])
-            all_tracks.extend(t["uri"] for t in items if t.get("uri"))
-        except:
-            pass
-    
-    # Combined search if not enough results
-    if len(all_tracks) < desired_count:
-        try:
-            or_query = " OR ".join([f'genre:"{g}"' for g in genres])
-            results2 = sp_client.search(q=or_query, type="track", limit=50, market=market)
-            items2 = results2.get("tracks", {}).get("items", [])
-            all_tracks.extend(t["uri"] for t in items2 if t.get("uri"))
-        except:
-            pass
+    # Every page of every genre + combined query, all in flight at once (first pages queued first)
+    pages = max(1, min(pages, MAX_SEARCH_OFFSET // SEARCH_PAGE_SIZE))
+    page_futures = [
+        _submit_search(session, q, market, page * SEARCH_PAGE_SIZE)
+        for page in range(pages) for q in genre_queries
+    ]
+    or_future = _submit_search(session, " OR ".join(genre_queries), market)
+    
+    # Merge pages as they complete (the pool deduplicates by URI, first hit wins)
+    enough = max(desired_count, pool_size)
+    pool = TrackPool()
+    for future in as_completed(page_futures):
+        pool.extend(future.result())
+        if len(pool) >= enough:
+            break
+    for future in page_futures:
+        future.cancel()   # pages still queued are not needed anymore
+    
+    # Combined results only if not enough
+    if len(pool) < desired_count:
+        pool.extend(or_future.result())
+    else:
+        or_future.cancel()
+    
+    # Shuffle
+    order = list(range(len(pool)))
+    random.shuffle(order)
+    
+    # Recently served tracks go last
+    fresh = order
+    if exclude is not None:
+        fresh = [i for i in order if pool.uris[i] not in exclude]
+        if len(fresh) < len(order):
+            kept = set(fresh)
+            order = fresh + [i for i in order if i not in kept]
     
-    # Deduplicate and shuffle
-    all_tracks = list(dict.fromkeys(all_tracks))
-    random.shuffle(all_tracks)
-    return all_tracks[:desired_count]
+    # Rank by audio features when we know them
+    index = get_feature_index()
+    if target and index is not None:
+        nearest = index.nearest(target, desired_count, candidates=[pool.uris[i] for i in fresh])
+        picked = set(nearest)
+        order = [pool.position(uri) for uri in nearest] + [i for i in order if pool.uris[i] not in picked]
+    
+    return pool.take(order[:desired_count])
 
 
-def get_track_preview_info(sp_client, track_uris, count=6):
+def get_tracks_for_mood_via_catalog(mood: str, desired_count: int = 25, target=None, exclude=None):
+    
+    ## Picks tracks for a mood from the offline catalog (no Spotify call)
+    ## exclude: recently served URIs, skipped while enough other tracks are left
+    ## Returns a list of Track records, or None when no catalog is installed
+    
+    catalog = get_catalog()
+    if catalog is None:
+        return None
+    cfg = MOOD_TO_SPOTIFY.get(mood, MOOD_TO_SPOTIFY["Neutral"])
+    return catalog.select(cfg["seed_genres"], target or {}, desired_count, exclude=exclude)
+
+
+def get_track_preview_info(sp_client, tracks, count=6):
     
     ##Retrieves preview information for the first tracks
-    ##Return format: list of strings "artist|title|image_url"
+    ##Track records from search already carry their metadata (no API call);
+    ##bare URIs are looked up with sp_client.tracks
+    ##Return format: list of Track
     
-    preview_list = []
     try:
-        top_tracks = sp_client.tracks(track_uris[:count])
-        for track in top_tracks['tracks']:
-            artist = track['artists'][0]['name']
-            title = track['name']
-            try:
-                img_url = track['album']['images'][-1]['url']
-            except:
-                img_url = ""
-            preview_list.append(f"{artist}|{title}|{img_url}")
-    except:
-        preview_list = ["System|Preview Unavailable|"]
-    
-    return preview_list
+        top = list(tracks[:count])
+        if top and isinstance(top[0], str):
+            top = [Track.from_api(t) for t in sp_client.tracks(top)['tracks']]
+        return top
+    except Exception:
+        return [Track("", "System", "Preview Unavailable", "")]
 
 
-def create_spotify_playlist(weather_data, sp_client):
+def create_spotify_playlist(weather_data, session, source: str = TRACK_SOURCE, playlist_mode: str = PLAYLIST_MODE,
+                            cancel=None, progress=None):
     
     ##Creates a Spotify playlist based on weather data
+    ##session: SpotifySession (a bare spotipy client is wrapped, costing a me() call)
+    ##source: "search" (live Spotify search) or "catalog" (offline catalog, search if absent)
+    ##playlist_mode: "new" (one playlist per generation), "user" (one rolling playlist per user)
+    ##or "mood" (one rolling playlist per user and mood, updated in place)
+    ##cancel: optional threading.Event, checked before each Spotify stage
+    ##progress: optional callback(stage, fraction, event, data), called with the stage events
+    ##"candidates" ({"count", "tech"}), "preview" ({"preview", "tech"}) and "playlist" ({"message", "url"})
     ##Returns: (message, url, tech_data, preview_list)
     
+    def stage(label, fraction, event=None, data=None):
+        if progress is not None:
+            progress(label, fraction, event, data)
+        return cancel is not None and cancel.is_set()
+    
     params = map_weather_to_spotify(weather_data)
     mood = params.pop("_mood", "Neutral")
     
@@ -108,35 +288,79 @@ def create_spotify_playlist(weather_data, sp_client):
     
     desired_count = params.get("limit", 25)
     
+    # The user is needed up front: their recently served tracks are skipped
+    session = _as_session(session)
+    sp_client = session.client
+    try:
+        user_id = session.user_id
+    except Exception as e:
+        return f"Creation Error: {e}", None, None, None
+    history = session.history
+    
     # Search for tracks
+    if stage("Searching tracks...", 0.3):
+        return "Cancelled", None, None, None
     try:
-        track_uris = get_tracks_for_mood_via_search(
-            sp_client, 
-            mood=mood, 
-            desired_count=desired_count
-        )
+        tracks = None
+        if source == "catalog":
+            tracks = get_tracks_for_mood_via_catalog(mood, desired_count, target=params, exclude=history)
+        if not tracks or len(tracks) < 5:
+            tracks = get_tracks_for_mood_via_search(
+                session, 
+                mood=mood, 
+                desired_count=desired_count,
+                target=params,
+                exclude=history
+            )
     except Exception as e:
         return f"Search Error: {e}", None, None, None
     
-    if len(track_uris) < 5:
-        return f"Not enough tracks ({len(track_uris)}).", None, None, None
+    if len(tracks) < 5:
+        return f"Not enough tracks ({len(tracks)}).", None, None, None
+    
+    stage(f"Found {len(tracks)} tracks", 0.5, "candidates", {"count": len(tracks), "tech": tech_data})
     
-    # Track preview
-    preview_list = get_track_preview_info(sp_client, track_uris)
+    # Track preview (from search metadata, no extra request)
+    preview_list = get_track_preview_info(sp_client, tracks)
+    track_uris = [t.uri for t in tracks]
     
-    # Create playlist
+    # Create (or update the rolling) playlist
+    if stage("Creating playlist...", 0.7, "preview", {"preview": preview_list, "tech": tech_data}):
+        return "Cancelled", None, None, None
     try:
-        user_id = sp_client.me()["id"]
-        playlist_name = f"Vienna Vibe: {weather_data['condition']} 🇦🇹"
-        playlist = sp_client.user_playlist_create(
-            user=user_id,
-            name=playlist_name,
-            public=True,
-            description=f"Weather: {weather_data['description']} | Mood: {mood}"
-        )
-        sp_client.playlist_add_items(playlist_id=playlist["id"], items=track_uris)
+        if playlist_mode in ("user", "mood"):
+            def create_rolling():
+                name = f"Vienna Vibe: {mood} 🇦🇹" if playlist_mode == "mood" else "Vienna Vibe 🇦🇹"
+                return sp_client.user_playlist_create(
+                    user=user_id,
+                    name=name,
+                    public=True,
+                    description="Rolling weather playlist, refreshed by Vienna Vibe"
+                )
+            
+            key = playlist_key(user_id, mood, playlist_mode)
+            _playlist_id, url, reused = update_rolling_playlist(
+                sp_client, session.rolling_playlists, key, track_uris, create_rolling
+            )
+            msg = "Playlist Updated!" if reused else "Playlist Created!"
+        else:
+            playlist_name = f"Vienna Vibe: {weather_data['condition']} 🇦🇹"
+            playlist = sp_client.user_playlist_create(
+                user=user_id,
+                name=playlist_name,
+                public=True,
+                description=f"Weather: {weather_data['description']} | Mood: {mood}"
+            )
+            sp_client.playlist_add_items(playlist_id=playlist["id"], items=track_uris)
+            url = playlist["external_urls"]["spotify"]
+            msg = "Playlist Created!"
+        
+        if history is not None:
+            history.add(track_uris)
+            history.save()
         
-        return "Playlist Created!", playlist["external_urls"]["spotify"], tech_data, preview_list
+        stage(msg, 1.0, "playlist", {"message": msg, "url": url})
+        return msg, url, tech_data, preview_list
     
     except Exception as e:
         return f"Creation Error: {e}", None, None, None
\ No newline at end of file
@@ -0,0 +1,9 @@
+# conftest.py
+# Runs the suite against the modules in the repository root, without touching
+# the on-disk caches of a local install.
+import os
+import sys
+from pathlib import Path
+
+os.environ["VIBE_TRACK_CACHE_PERSIST"] = "0"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
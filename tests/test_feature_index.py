@@ -0,0 +1,67 @@
+# test_feature_index.py
+# Nearest-mood ranking of the local feature index, on its own and through the
+# search path (candidates come from the track cache, so no Spotify call is made).
+from pathlib import Path
+import numpy as np
+import pytest
+import spotify_manager
+from feature_index import TrackFeatureIndex, target_vector
+from spotify_manager import SpotifySession, get_tracks_for_mood_via_search
+from track_cache import TrackPoolCache
+from tracks import Track, TrackPool
+from weather_logic import MOOD_TO_SPOTIFY
+
+FIXTURE = Path(__file__).parent / "data" / "track_features.csv"
+PARAMS = {"target_valence": 0.8, "target_energy": 0.7, "target_tempo": 120, "target_acousticness": 0.1}
+MOOD = "Energize"
+MARKET = "AT"
+
+
+def brute_force(index, uris, params):
+    ##URIs sorted by squared distance to the mood target, one row at a time
+    target = target_vector(params)
+    return sorted(uris, key=lambda uri: float(np.square(index.features[index.position(uri)] - target).sum()))
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = TrackFeatureIndex.from_csv(FIXTURE)
+    monkeypatch.setattr(spotify_manager, "get_feature_index", lambda: index)
+    return index
+
+
+@pytest.fixture
+def session(index):
+    # Every search of the mood is a cache hit returning the whole fixture
+    pool = TrackPool(Track(uri, title=f"Track {i}") for i, uri in enumerate(index.uris))
+    queries = [f'genre:"{g}"' for g in MOOD_TO_SPOTIFY[MOOD]["seed_genres"]]
+    cache = TrackPoolCache()
+    for query in queries + [" OR ".join(queries)]:
+        cache.put((query, MARKET, 0), pool)
+    return SpotifySession(client=None, track_cache=cache)
+
+
+def test_nearest_matches_brute_force(index):
+    expected = brute_force(index, index.uris, PARAMS)
+    assert index.nearest(PARAMS, 5) == expected[:5]
+    assert index.nearest(PARAMS, 3, candidates=expected[2:]) == expected[2:5]
+
+
+def test_search_ranks_candidates_by_mood(index, session):
+    tracks = get_tracks_for_mood_via_search(session, MOOD, 5, market=MARKET, target=PARAMS)
+    assert [t.uri for t in tracks] == brute_force(index, index.uris, PARAMS)[:5]
+
+
+def test_search_ranks_only_fresh_candidates(index, session):
+    served = set(brute_force(index, index.uris, PARAMS)[:2])
+    fresh = [uri for uri in index.uris if uri not in served]
+    tracks = get_tracks_for_mood_via_search(session, MOOD, 5, market=MARKET, target=PARAMS, exclude=served)
+    assert [t.uri for t in tracks] == brute_force(index, fresh, PARAMS)[:5]
+
+
+def test_search_fills_up_with_served_tracks(index, session):
+    served = set(index.uris[2:])
+    tracks = get_tracks_for_mood_via_search(session, MOOD, 5, market=MARKET, target=PARAMS, exclude=served)
+    uris = [t.uri for t in tracks]
+    assert uris[:2] == brute_force(index, index.uris[:2], PARAMS)
+    assert len(uris) == 5 and set(uris[2:]) <= served
@@ -0,0 +1,183 @@
+# token_cache.py
+# OAuth token caching for spotipy. API calls read the token from memory; it is
+# persisted (to .spotipyoauthcache, or to Redis so several workers share it)
+# only when it changes, and a background thread refreshes it shortly before it
+# expires so no API call waits for a refresh.
+import atexit
+import json
+import threading
+import time
+from spotipy.cache_handler import CacheHandler
+from config import TOKEN_CACHE_PATH, TOKEN_REDIS_URL, TOKEN_REDIS_KEY, TOKEN_REFRESH_MARGIN
+
+try:
+    import redis
+except ImportError:   # optional, only needed with VIBE_TOKEN_REDIS_URL
+    redis = None
+
+
+class MemoryTokenCache(CacheHandler):
+    ##Token held in memory, written behind to a JSON file when it changes
+
+    def __init__(self, path=None):
+        self.path = path
+        self._token = None
+        self._pending = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        if path:
+            self._token = self._read()
+            atexit.register(self.flush)
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Token cache read error: {e}")
+            return None
+
+    def get_cached_token(self):
+        with self._lock:
+            return self._token
+
+    def save_token_to_cache(self, token_info):
+        with self._lock:
+            if token_info == self._token:
+                return
+            self._token = token_info
+            if not self.path:
+                return
+            self._pending = token_info
+        threading.Thread(target=self.flush, name="token-write", daemon=True).start()
+
+    def flush(self):
+        ##Writes the latest unsaved token (no-op if none)
+        with self._write_lock:
+            with self._lock:
+                token, self._pending = self._pending, None
+            if token is None:
+                return
+            try:
+                with open(self.path, "w", encoding="utf-8") as f:
+                    json.dump(token, f)
+            except Exception as e:
+                print(f"Token cache write error: {e}")
+
+
+class RedisTokenCache(CacheHandler):
+    ##Token shared through Redis by several workers, with an in-memory copy
+    ##Redis is read again only when the local copy is close to expiry
+
+    def __init__(self, client, key=TOKEN_REDIS_KEY, margin=TOKEN_REFRESH_MARGIN):
+        self.client = client
+        self.key = key
+        self.margin = margin
+        self._token = None
+        self._lock = threading.Lock()
+
+    def get_cached_token(self):
+        with self._lock:
+            token = self._token
+        if token is None or token.get("expires_at", 0) - time.time() < self.margin:
+            try:
+                raw = self.client.get(self.key)
+            except Exception as e:
+                print(f"Token cache read error: {e}")
+                return token
+            if raw:
+                token = json.loads(raw)
+                with self._lock:
+                    self._token = token
+        return token
+
+    def save_token_to_cache(self, token_info):
+        with self._lock:
+            if token_info == self._token:
+                return
+            self._token = token_info
+        try:
+            self.client.set(self.key, json.dumps(token_info))
+        except Exception as e:
+            print(f"Token cache write error: {e}")
+
+    def claim_refresh(self, ttl: int = 30) -> bool:
+        ##True for the one worker that should refresh now (the others pick up its token)
+        try:
+            return bool(self.client.set(f"{self.key}:refresh", "1", nx=True, ex=ttl))
+        except Exception:
+            return True
+
+
+class TokenRefresher:
+    ##Daemon thread refreshing the auth manager's token `margin` seconds before it expires
+    ##(only tokens that already cover the requested scope)
+
+    def __init__(self, auth_manager, margin: float = TOKEN_REFRESH_MARGIN, retry: float = 60):
+        self.auth_manager = auth_manager
+        self.margin = margin
+        self.retry = retry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="token-refresh", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        handler = self.auth_manager.cache_handler
+        while not self._stop.is_set():
+            token = handler.get_cached_token()
+            if not token or "refresh_token" not in token:
+                wait = self.retry   # not authorized yet
+            elif not self.auth_manager._is_scope_subset(self.auth_manager.scope, token.get("scope")):
+                # Issued for fewer scopes: refreshing would relabel it with the new ones,
+                # leave it to the interactive flow to re-authorize
+                wait = self.retry
+            else:
+                wait = token.get("expires_at", 0) - self.margin - time.time()
+                if wait <= 0:
+                    claim = getattr(handler, "claim_refresh", None)
+                    if claim is None or claim():
+                        try:
+                            self.auth_manager.refresh_access_token(token["refresh_token"])
+                            continue
+                        except Exception as e:
+                            print(f"Token refresh error: {e}")
+                        wait = self.retry
+                    else:
+                        wait = 5   # another worker is refreshing
+            self._stop.wait(max(wait, 1))
+
+
+_token_cache = None
+_refresher = None
+_token_lock = threading.Lock()
+
+
+def get_token_cache():
+    ##Process-wide token cache: Redis when VIBE_TOKEN_REDIS_URL is set, else memory + file
+    global _token_cache
+    with _token_lock:
+        if _token_cache is None:
+            if TOKEN_REDIS_URL and redis is None:
+                print("Token cache: redis is not installed, using the token file")
+            if TOKEN_REDIS_URL and redis is not None:
+                _token_cache = RedisTokenCache(redis.Redis.from_url(TOKEN_REDIS_URL))
+            else:
+                _token_cache = MemoryTokenCache(TOKEN_CACHE_PATH)
+        return _token_cache
+
+
+def start_token_refresher(auth_manager):
+    ##Starts the background refresh once per process
+    global _refresher
+    with _token_lock:
+        if _refresher is None:
+            _refresher = TokenRefresher(auth_manager)
+            _refresher.start()
+        return _refresher
@@ -0,0 +1,124 @@
+# track_cache.py
+# Candidate track pools from Spotify search, cached per (query, market, offset).
+# Entries expire after a TTL, the cache is bounded (least recently used entries
+# are evicted first) and it can be persisted to disk across restarts.
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from tracks import TrackPool
+
+
+class TrackPoolCache:
+    ##TTL + LRU cache of TrackPool values (treat cached pools as read-only)
+
+    def __init__(self, max_entries: int = 256, ttl: float = 6 * 3600, path=None, save_interval: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.save_interval = save_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # key -> (stored_at, tracks)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()   # one save at a time, latest entries land last
+        self._dirty = False
+        self._last_save = 0.0
+        if path:
+            self.load()
+            atexit.register(self.save)
+
+    def get(self, key):
+        ##Returns the cached pool for key, or None if missing/expired
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, pool: TrackPool):
+        ##Stores a pool, evicting the least recently used entries beyond max_entries
+        with self._lock:
+            self._entries[key] = (time.time(), pool)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+            due = self.path and time.time() - self._last_save > self.save_interval
+        if due:
+            self.save()
+
+    def items(self):
+        ##Non-expired (key, pool) pairs, oldest first
+        now = time.time()
+        with self._lock:
+            return [
+                (key, pool) for key, (stored_at, pool) in self._entries.items()
+                if now - stored_at <= self.ttl
+            ]
+
+    def clear(self):
+        ##Drops every pool
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    def stats(self) -> dict:
+        ##Hit/miss counters and current size
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def save(self):
+        ##Writes non-expired entries to disk (no-op without a path or changes)
+        ##through a temp file swapped in with os.replace, so a crash or a concurrent
+        ##save never leaves a partial file
+        if not self.path:
+            return
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                now = time.time()
+                rows = [
+                    {"key": list(key), "stored_at": stored_at, "tracks": pool.to_columns()}
+                    for key, (stored_at, pool) in self._entries.items()
+                    if now - stored_at <= self.ttl
+                ]
+                self._dirty = False
+                self._last_save = now
+            tmp = f"{self.path}.tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(rows, f)
+                os.replace(tmp, self.path)
+            except Exception as e:
+                print(f"Track cache save error: {e}")
+
+    def load(self):
+        ##Reads entries saved by a previous run, skipping expired ones
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                rows = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Track cache load error: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for row in rows[-self.max_entries:]:
+                try:
+                    if now - row["stored_at"] <= self.ttl:
+                        pool = TrackPool.from_columns(row["tracks"])
+                        self._entries[tuple(row["key"])] = (row["stored_at"], pool)
+                except (KeyError, TypeError):
+                    continue   # entry written by an older format
+            self._last_save = now
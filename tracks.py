@@ -0,0 +1,85 @@
+# tracks.py
+# Typed track records shared by spotify_manager, track_cache and event_handlers.
+from typing import NamedTuple
+
+
+class Track(NamedTuple):
+    ##One track with the metadata we display (no string packing)
+    uri: str
+    artist: str = ""
+    title: str = ""
+    image_url: str = ""
+
+    @classmethod
+    def from_api(cls, item):
+        ##Builds a Track from a Spotify track object (search or tracks endpoint)
+        try:
+            img_url = item['album']['images'][-1]['url']
+        except (KeyError, IndexError, TypeError):
+            img_url = ""
+        artists = item.get('artists') or [{}]
+        return cls(item["uri"], artists[0].get('name', ""), item.get('name', ""), img_url)
+
+
+class TrackPool:
+    ##Columnar list of unique tracks (one list per field + URI index)
+    ##Much lighter than one object per track when pools reach thousands of entries
+
+    __slots__ = ("uris", "artists", "titles", "image_urls", "_index")
+
+    def __init__(self, tracks=()):
+        self.uris = []
+        self.artists = []
+        self.titles = []
+        self.image_urls = []
+        self._index = {}
+        self.extend(tracks)
+
+    def add(self, track) -> bool:
+        ##Appends a track unless its URI is already in the pool
+        if track.uri in self._index:
+            return False
+        self._index[track.uri] = len(self.uris)
+        self.uris.append(track.uri)
+        self.artists.append(track.artist)
+        self.titles.append(track.title)
+        self.image_urls.append(track.image_url)
+        return True
+
+    def extend(self, tracks) -> int:
+        ##Appends many tracks (Track or TrackPool); returns how many were new
+        return sum(self.add(track) for track in tracks)
+
+    def __len__(self):
+        return len(self.uris)
+
+    def __contains__(self, uri):
+        return uri in self._index
+
+    def position(self, uri) -> int:
+        ##Position of a URI in the pool (KeyError if absent)
+        return self._index[uri]
+
+    def __getitem__(self, i) -> Track:
+        return Track(self.uris[i], self.artists[i], self.titles[i], self.image_urls[i])
+
+    def __iter__(self):
+        return map(Track, self.uris, self.artists, self.titles, self.image_urls)
+
+    def take(self, indices):
+        ##Tracks at the given positions, in that order
+        return [self[i] for i in indices]
+
+    def to_columns(self) -> dict:
+        ##JSON-serializable form
+        return {
+            "uri": self.uris,
+            "artist": self.artists,
+            "title": self.titles,
+            "image_url": self.image_urls,
+        }
+
+    @classmethod
+    def from_columns(cls, columns):
+        ##Inverse of to_columns
+        return cls(map(Track, columns["uri"], columns["artist"], columns["title"], columns["image_url"]))
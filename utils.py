@@ -3,52 +3,197 @@ import flet as ft
 import datetime
 import threading
 import time
+from config import RENDER_FRAME_INTERVAL
+
+
+CLOCK_FORMAT_SECONDS = "%a %d %b %H:%M:%S"
+CLOCK_FORMAT_MINUTES = "%a %d %b %H:%M"
+
+
+class ClockTicker:
+    ##One process-wide thread driving every session's clock
+    ##Ticks each second while a registered clock shows seconds, else each minute
+    
+    def __init__(self):
+        self._clocks = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+    
+    def register(self, clock):
+        ##Adds a clock (starts the thread on first use)
+        with self._lock:
+            self._clocks.add(clock)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="clock-ticker", daemon=True)
+                self._thread.start()
+        self._wake.set()
+    
+    def unregister(self, clock):
+        ##Removes a clock (disconnected session)
+        with self._lock:
+            self._clocks.discard(clock)
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._clocks)
+    
+    def _run(self):
+        ##Internal update loop
+        while True:
+            with self._lock:
+                clocks = list(self._clocks)
+            if not clocks:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            
+            now = datetime.datetime.now()
+            for clock in clocks:
+                if not clock.update(now):
+                    self.unregister(clock)
+            
+            # Sleep to the next second/minute boundary (or until a clock registers)
+            step = 1 if any(clock.show_seconds for clock in clocks) else 60
+            self._wake.wait(step - time.time() % step)
+            self._wake.clear()
+
+
+clock_ticker = ClockTicker()
 
 
 class ClockManager:
-    ##Manages the clock display and updates
+    ##Manages the clock display of one session (driven by the shared clock_ticker)
     
     
-    def __init__(self, page):
+    def __init__(self, page, show_seconds=True):
         self.page = page
+        self.show_seconds = show_seconds
         self.clock_text = ft.Text(
-            datetime.datetime.now().strftime("%a %d %b %H:%M:%S"),
+            datetime.datetime.now().strftime(self._format()),
             size=12,
             color="grey"
         )
-        self._running = False
-        self._thread = None
+        self._mounted = False
+    
+    def _format(self):
+        return CLOCK_FORMAT_SECONDS if self.show_seconds else CLOCK_FORMAT_MINUTES
     
     def get_control(self):
         ##Returns the clock UI control
         return self.clock_text
     
-    def update(self):
-        ##Manually updates the clock
-        self.clock_text.value = datetime.datetime.now().strftime("%a %d %b %H:%M:%S")
+    def update(self, now=None):
+        ##Updates the clock control only (no page diff); False once the session is gone
+        if self.clock_text.page is None:
+            return not self._mounted   # not on the page yet, or detached from it
+        self._mounted = True
+        text = (now or datetime.datetime.now()).strftime(self._format())
+        if text == self.clock_text.value:
+            return True
+        self.clock_text.value = text
         try:
-            self.page.update()
-        except:
-            pass
-    
-    def _clock_loop(self):
-        ##Internal update loop
-        while self._running:
-            time.sleep(1)
-            self.update()
+            self.clock_text.update()
+            return True
+        except Exception as e:
+            print(f"Clock stopped: {e}")
+            return False
     
     def start(self):
         ##Starts automatic update
-        if not self._running:
-            self._running = True
-            self._thread = threading.Thread(target=self._clock_loop, daemon=True)
-            self._thread.start()
+        clock_ticker.register(self)
     
     def stop(self):
         ##Stops automatic update
-        self._running = False
-        if self._thread:
-            self._thread.join(timeout=2)
+        clock_ticker.unregister(self)
+
+
+class RenderLoop:
+    ##One process-wide thread flushing every session's RenderScheduler when its frame is due
+    
+    def __init__(self):
+        self._due = {}   # scheduler -> monotonic time of its flush
+        self._cond = threading.Condition()
+        self._thread = None
+    
+    def schedule(self, scheduler, delay):
+        ##Flushes the scheduler after `delay` seconds (no-op if already scheduled)
+        with self._cond:
+            if scheduler in self._due:
+                return
+            self._due[scheduler] = time.monotonic() + delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="render-loop", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+    
+    def _run(self):
+        ##Internal flush loop
+        while True:
+            with self._cond:
+                while not self._due:
+                    self._cond.wait()
+                now = time.monotonic()
+                ready = [scheduler for scheduler, due in self._due.items() if due <= now]
+                if not ready:
+                    self._cond.wait(min(self._due.values()) - now)
+                    continue
+                for scheduler in ready:
+                    del self._due[scheduler]
+            for scheduler in ready:
+                scheduler.flush()
+
+
+render_loop = RenderLoop()
+
+
+class RenderScheduler:
+    ##Coalesces UI updates: controls marked dirty within one frame interval are sent together
+    ##by a single page.update(*controls) (one websocket message with only their diffs)
+    ##Flushes run on the shared render_loop thread (no thread per session or frame)
+    
+    def __init__(self, page, interval=RENDER_FRAME_INTERVAL):
+        self.page = page
+        self.interval = interval
+        self._dirty = {}   # id -> control, in marking order
+        self._page_dirty = False
+        self._scheduled = False
+        self._lock = threading.Lock()
+    
+    def mark(self, *controls):
+        ##Schedules controls (and their children) for the next flush
+        with self._lock:
+            for control in controls:
+                self._dirty[id(control)] = control
+            self._schedule()
+    
+    def mark_page(self):
+        ##Schedules a full page update (page-level properties: theme, bgcolor, appbar)
+        with self._lock:
+            self._page_dirty = True
+            self._schedule()
+    
+    def _schedule(self):
+        # Caller holds the lock; the first mark of a frame schedules its flush
+        if not self._scheduled:
+            self._scheduled = True
+            render_loop.schedule(self, self.interval)
+    
+    def flush(self):
+        ##Sends the pending updates now
+        with self._lock:
+            controls = list(self._dirty.values())
+            page_dirty = self._page_dirty
+            self._dirty.clear()
+            self._page_dirty = False
+            self._scheduled = False
+        try:
+            if page_dirty:
+                self.page.update()
+            elif controls:
+                self.page.update(*controls)
+        except Exception as e:
+            print(f"Render error: {e}")
 
 
 def create_appbar(clock_manager, user_name, event_handlers):
@@ -0,0 +1,150 @@
+# weather_async.py
+# Asyncio variant of the weather_logic API on one shared httpx.AsyncClient.
+# Snapshots are shared with the synchronous API, so whichever side fetches
+# first serves the other until the next hour boundary. Cache and store calls
+# (SQLite) run in worker threads so they never block the event loop.
+import asyncio
+import random
+import time
+import httpx
+from config import (
+    WEATHER_CONNECT_TIMEOUT, WEATHER_READ_TIMEOUT, WEATHER_MAX_RETRIES,
+    WEATHER_BACKOFF_FACTOR, WEATHER_BACKOFF_JITTER, WEATHER_POOL_SIZE
+)
+from weather_logic import (
+    WEATHER_URL, VIENNA_LAT, VIENNA_LON, SNAPSHOT_DAYS, weather_latency,
+    build_snapshot_params, parse_snapshot, cached_snapshot, stored_snapshot, remember_snapshot, fallback_snapshot,
+    current_from_snapshot, forecast_from_snapshot, hourly_from_snapshot, offline_weather
+)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_client = None
+_inflight = {}
+
+
+def get_async_client():
+    ##Returns the shared connection-pooled async client (created on first use)
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(WEATHER_READ_TIMEOUT, connect=WEATHER_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=WEATHER_POOL_SIZE,
+                max_keepalive_connections=WEATHER_POOL_SIZE
+            )
+        )
+    return _client
+
+
+async def aclose():
+    ##Closes the shared client (e.g. on app shutdown)
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def weather_get(params):
+    ##GET on WEATHER_URL with bounded retries and jittered exponential backoff
+    client = get_async_client()
+    start = time.perf_counter()
+    ok = False
+    try:
+        for attempt in range(WEATHER_MAX_RETRIES + 1):
+            last_try = attempt == WEATHER_MAX_RETRIES
+            try:
+                response = await client.get(WEATHER_URL, params=params)
+                if response.status_code not in RETRY_STATUSES or last_try:
+                    response.raise_for_status()
+                    ok = True
+                    return response.json()
+            except httpx.TransportError:
+                if last_try:
+                    raise
+            delay = WEATHER_BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, WEATHER_BACKOFF_JITTER)
+            await asyncio.sleep(delay)
+    finally:
+        weather_latency.record(time.perf_counter() - start, ok)
+
+
+async def _fetch_snapshot(lat, lon, forecast_days):
+    ##Fetches, parses and publishes a snapshot (last-known-good data on failure)
+    try:
+        data = await weather_get(build_snapshot_params(lat, lon, forecast_days))
+    except Exception as e:
+        snapshot = await asyncio.to_thread(fallback_snapshot, lat, lon)
+        if snapshot is None:
+            raise
+        print(f"Weather API error, serving stored data: {e}")
+        return snapshot
+
+    snapshot = parse_snapshot(data, forecast_days)
+    await asyncio.to_thread(remember_snapshot, lat, lon, snapshot)
+    return snapshot
+
+
+async def get_weather_snapshot(forecast_days: int = SNAPSHOT_DAYS, lat: float = VIENNA_LAT, lon: float = VIENNA_LON):
+    ##Async counterpart of weather_logic.get_weather_snapshot
+    ##Concurrent callers for the same location share one in-flight request; once the
+    ##hour is over the stored snapshot is served (stale) while that request runs
+    snapshot = await asyncio.to_thread(cached_snapshot, lat, lon, forecast_days)
+    if snapshot:
+        return snapshot
+
+    days = max(forecast_days, SNAPSHOT_DAYS)
+    key = (lat, lon, days)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_snapshot(lat, lon, days))
+        _inflight[key] = task
+
+        def done(t):
+            _inflight.pop(key, None)
+            if not t.cancelled():
+                t.exception()   # retrieved here, nobody may await a background refresh
+
+        task.add_done_callback(done)
+
+    snapshot = await asyncio.to_thread(stored_snapshot, lat, lon, forecast_days)
+    if snapshot:
+        return snapshot
+    return await asyncio.shield(task)
+
+
+# RETRIEVAL FUNCTIONS
+async def get_current_weather():
+    ##Retrieves weather and adds temporal details
+    try:
+        return current_from_snapshot(await get_weather_snapshot())
+    except Exception as e:
+        print(f"API Error: {e}")
+        return offline_weather()
+
+
+async def get_forecast(forecast_days: int = 5):
+    ##Returns a list of data for the next days
+    try:
+        return forecast_from_snapshot(await get_weather_snapshot(forecast_days), forecast_days)
+    except Exception as e:
+        print(f"Forecast API error: {e}")
+        return []
+
+
+async def get_hourly_forecast(date_str: str, days: int = 5):
+    ##Returns the list of hours for a given date (YYYY-MM-DD)
+    try:
+        return hourly_from_snapshot(await get_weather_snapshot(days), date_str)
+    except Exception as e:
+        print(f"Hourly forecast API error: {e}")
+        return []
+
+
+async def get_weather_bundle(forecast_days: int = 5):
+    ##Current weather and forecast retrieved concurrently
+    ##Returns: (current_weather, forecast)
+    current, forecast = await asyncio.gather(
+        get_current_weather(),
+        get_forecast(forecast_days)
+    )
+    return current, forecast
@@ -1,12 +1,48 @@
 # weather_logic.py
 import requests
 import datetime
+import threading
+import time
 import pytz 
+import numpy as np
+from concurrent.futures import Future
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import (
+    DEFAULT_LOCATION, LOCATIONS as CONFIG_LOCATIONS, WEATHER_BACKEND,
+    WEATHER_CONNECT_TIMEOUT, WEATHER_READ_TIMEOUT, WEATHER_MAX_RETRIES,
+    WEATHER_BACKOFF_FACTOR, WEATHER_BACKOFF_JITTER, WEATHER_POOL_SIZE,
+    WEATHER_STORE_MAX_AGE, WEATHER_STALE_RETRY
+)
+from metrics import LatencyStats
+import weather_store
+
+try:
+    import openmeteo_requests
+except ImportError:  # optional FlatBuffers backend
+    openmeteo_requests = None
 
 # CONFIGURATION & DICTIONARY 
 VIENNA_LAT = 48.2085
 VIENNA_LON = 16.3721
 WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+MAX_LOCATIONS_PER_REQUEST = 100
+
+# Location registry (name -> (lat, lon)), seeded from config
+LOCATIONS = dict(CONFIG_LOCATIONS)
+
+
+def register_location(name: str, lat: float, lon: float):
+    ##Adds or updates a location the mood engine can run for
+    LOCATIONS[name] = (lat, lon)
+
+
+def get_location(name: str = None):
+    ##Returns (lat, lon) for a registered location (default: Vienna)
+    name = name or DEFAULT_LOCATION
+    if name not in LOCATIONS:
+        raise KeyError(f"Unknown location: {name}")
+    return LOCATIONS[name]
 
 # We keep this dictionary because main.py imports it, even though we use smarter logic below
 MOOD_TO_SPOTIFY = {
@@ -18,52 +54,628 @@ MOOD_TO_SPOTIFY = {
     "Neutral": {"seed_genres": ["chill", "ambient"]},
 }
 
-# RETRIEVAL FUNCTION 
-def get_current_weather():
-    ##Retrieves weather and adds temporal details
-    params = {
-        "latitude": VIENNA_LAT,
-        "longitude": VIENNA_LON,
-        "hourly": "temperature_2m,rain,snowfall,wind_speed_10m,weather_code,visibility",
+# WMO WEATHER CODES -> CONDITION
+# One lookup table indexed by WMO code; missing or unknown codes map to "Neutral".
+CONDITIONS = ("Neutral", "Clear", "Cloudy", "Rain", "Snow", "Thunderstorm")
+WMO_CONDITION_CODES = {
+    "Clear": [0],
+    "Cloudy": [1, 2, 3],
+    "Rain": [51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82],
+    "Snow": [71, 73, 75, 77, 85, 86],
+    "Thunderstorm": [95, 96, 99],
+}
+
+_CONDITION_NAMES = np.array(CONDITIONS, dtype=object)
+_CONDITION_LUT = np.zeros(100, dtype=np.int8)
+for _index, _name in enumerate(CONDITIONS):
+    _CONDITION_LUT[WMO_CONDITION_CODES.get(_name, [])] = _index
+
+
+def to_float_array(values):
+    ##JSON list -> float64 array, None becomes NaN
+    ##Float arrays (e.g. FlatBuffers float32 views) are returned as they are, without a copy
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+        return values
+    return np.asarray(values if values is not None else [], dtype=float)
+
+
+def to_time_array(values, unit):
+    ##ISO strings (JSON) or epoch-based datetime64 -> datetime64 array of the given unit ('m' or 'D')
+    return np.asarray(values if values is not None else [], dtype=f'datetime64[{unit}]')
+
+
+def classify_weather_codes(codes):
+    ##Maps an array of WMO codes to condition names in one vectorized pass
+    codes = to_float_array(codes)
+    valid = np.isfinite(codes) & (codes >= 0) & (codes < len(_CONDITION_LUT)) & (codes == np.floor(codes))
+    index = np.zeros(codes.shape, dtype=np.int8)
+    index[valid] = _CONDITION_LUT[codes[valid].astype(np.intp)]
+    return _CONDITION_NAMES[index]
+
+
+def _value_at(values, i):
+    ##Python float at index i, or None when out of range / missing
+    if i >= len(values) or np.isnan(values[i]):
+        return None
+    return float(values[i])
+
+
+def _code_at(codes, i):
+    ##WMO code at index i as int, or None when out of range / missing
+    value = _value_at(codes, i)
+    return None if value is None else int(value)
+
+
+# HTTP TRANSPORT
+# One pooled session for every Open-Meteo call: keep-alive connections,
+# connect/read timeouts and bounded retries with jittered exponential backoff.
+WEATHER_TIMEOUT = (WEATHER_CONNECT_TIMEOUT, WEATHER_READ_TIMEOUT)
+
+weather_latency = LatencyStats()
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    ##Returns the shared connection-pooled session for the weather API
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            retry = Retry(
+                total=WEATHER_MAX_RETRIES,
+                backoff_factor=WEATHER_BACKOFF_FACTOR,
+                backoff_jitter=WEATHER_BACKOFF_JITTER,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"GET"}),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(
+                pool_connections=WEATHER_POOL_SIZE,
+                pool_maxsize=WEATHER_POOL_SIZE,
+                max_retries=retry
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
+
+
+def weather_get(params):
+    ##GET on WEATHER_URL through the pooled session; latency is recorded per call
+    with weather_latency.measure():
+        response = get_http_session().get(WEATHER_URL, params=params, timeout=WEATHER_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+
+def get_weather_latency_stats():
+    ##Call count, errors and latency percentiles (ms) for weather requests
+    return weather_latency.snapshot()
+
+
+# WEATHER SNAPSHOT
+# Current, hourly and daily data come from one combined request and are cached
+# until the next hour boundary (the mood only changes hourly).
+SNAPSHOT_DAYS = 5
+HOURLY_VARIABLES = "temperature_2m,weather_code,wind_speed_10m"
+DAILY_VARIABLES = "temperature_2m_max,temperature_2m_min,weather_code"
+CURRENT_VARIABLES = "temperature_2m,weather_code,wind_speed_10m"
+
+_snapshot_cache = {}
+_snapshot_lock = threading.Lock()   # guards _snapshot_cache and _inflight (never held during I/O)
+_inflight = {}                      # (lat, lon, days) -> Future of the running upstream fetch
+
+
+def _next_hour_boundary(now=None):
+    ##Returns the timestamp of the next full hour (local time)
+    now = now or datetime.datetime.now()
+    next_hour = now.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+    return next_hour.timestamp()
+
+
+def build_snapshot_params(lat, lon, forecast_days):
+    ##Query for the single combined hourly + daily request
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "hourly": HOURLY_VARIABLES,
+        "daily": DAILY_VARIABLES,
         "timezone": "auto",
-        "forecast_days": 1
+        "forecast_days": forecast_days
     }
 
-    try:
-        response = requests.get(WEATHER_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Current hour
-        now = datetime.datetime.now()
-        current_hour_index = now.hour
-        
-        # Data extraction
-        temp = data['hourly']['temperature_2m'][current_hour_index]
-        weather_code = data['hourly']['weather_code'][current_hour_index]
-        wind = data['hourly']['wind_speed_10m'][current_hour_index]
-        
-        # Determine condition
-        condition = "Neutral"
-        if weather_code == 0: condition = "Clear"
-        elif weather_code in [1, 2, 3]: condition = "Cloudy"
-        elif weather_code in [51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82]: condition = "Rain"
-        elif weather_code in [71, 73, 75, 77, 85, 86]: condition = "Snow"
-        elif weather_code in [95, 96, 99]: condition = "Thunderstorm"
 
-        description = f"{condition} | {temp:.1f}°C | Wind {wind:.1f} km/h"
+def build_day_index(times):
+    ##Date (YYYY-MM-DD) -> (start, stop) slice of a chronological datetime64 series
+    if len(times) == 0:
+        return {}
+    dates = np.asarray(times).astype('datetime64[D]')
+    starts = np.concatenate(([0], np.flatnonzero(dates[1:] != dates[:-1]) + 1))
+    stops = np.append(starts[1:], len(dates))
+    return {str(dates[a]): (int(a), int(b)) for a, b in zip(starts, stops)}
+
 
+def parse_snapshot(data, forecast_days):
+    ##Keeps only the series we use from an Open-Meteo response
+    ##Numeric series become float arrays, timestamps datetime64 arrays (local wall clock)
+    ##and conditions are classified once here
+    hourly = data.get('hourly', {})
+    daily = data.get('daily', {})
+    hourly_times = to_time_array(hourly.get('time'), 'm')
+    hourly_codes = to_float_array(hourly.get('weather_code'))
+    daily_codes = to_float_array(daily.get('weather_code'))
+    return {
+        'fetched_at': time.time(),
+        'expires_at': _next_hour_boundary(),
+        'forecast_days': forecast_days,
+        'utc_offset_seconds': data.get('utc_offset_seconds'),
+        'hourly': {
+            'time': hourly_times,
+            'temperature_2m': to_float_array(hourly.get('temperature_2m')),
+            'weather_code': hourly_codes,
+            'wind_speed_10m': to_float_array(hourly.get('wind_speed_10m')),
+            'condition': classify_weather_codes(hourly_codes),
+            'day_index': build_day_index(hourly_times),
+        },
+        'daily': {
+            'time': to_time_array(daily.get('time'), 'D'),
+            'temperature_2m_max': to_float_array(daily.get('temperature_2m_max')),
+            'temperature_2m_min': to_float_array(daily.get('temperature_2m_min')),
+            'weather_code': daily_codes,
+            'condition': classify_weather_codes(daily_codes),
+        },
+    }
+
+
+# FLATBUFFERS BACKEND
+# Binary Open-Meteo responses decoded by openmeteo_requests: each series is a
+# NumPy view on the response buffer (no Python object per element), and the
+# current conditions come from the `current=` block.
+_openmeteo_client = None
+
+
+def use_flatbuffers():
+    ##True when the FlatBuffers backend is configured and installed
+    return WEATHER_BACKEND == "flatbuffers" and openmeteo_requests is not None
+
+
+def _get_openmeteo_client():
+    ##openmeteo_requests client on top of the shared pooled session
+    global _openmeteo_client
+    if _openmeteo_client is None:
+        _openmeteo_client = openmeteo_requests.Client(session=get_http_session())
+    return _openmeteo_client
+
+
+def _decode_series(block, names, offset, time_unit):
+    ##VariablesWithTime -> {'time': datetime64 array, name: float32 array, ...}
+    ##(variables come back in request order)
+    series = {}
+    for i, name in enumerate(names.split(",")):
+        series[name] = block.Variables(i).ValuesAsNumpy()
+    # Local wall clock, like the JSON API's "2025-01-01T13:00" (no string per element)
+    stamps = np.arange(block.Time(), block.TimeEnd(), block.Interval(), dtype=np.int64) + offset
+    series['time'] = stamps.astype('datetime64[s]').astype(f'datetime64[{time_unit}]')
+    return series
+
+
+def parse_flatbuffers_snapshot(response, forecast_days):
+    ##Builds the same snapshot structure as parse_snapshot from a WeatherApiResponse
+    offset = response.UtcOffsetSeconds()
+    hourly = _decode_series(response.Hourly(), HOURLY_VARIABLES, offset, 'm')
+    daily = _decode_series(response.Daily(), DAILY_VARIABLES, offset, 'D')
+
+    current_block = response.Current()
+    current = {
+        name: current_block.Variables(i).Value()
+        for i, name in enumerate(CURRENT_VARIABLES.split(","))
+    }
+
+    snapshot = parse_snapshot({'hourly': hourly, 'daily': daily, 'utc_offset_seconds': offset}, forecast_days)
+    snapshot['current'] = current
+    return snapshot
+
+
+def fetch_snapshots(lats, lons, forecast_days):
+    ##One upstream call for one or more coordinates (comma-separated)
+    ##Returns one parsed snapshot per coordinate, in request order
+    params = build_snapshot_params(lats, lons, forecast_days)
+    if use_flatbuffers():
+        params["current"] = CURRENT_VARIABLES
+        with weather_latency.measure():
+            responses = _get_openmeteo_client().weather_api(WEATHER_URL, params=params, timeout=WEATHER_TIMEOUT)
+        return [parse_flatbuffers_snapshot(r, forecast_days) for r in responses]
+
+    data = weather_get(params)
+    # One location -> JSON object, several -> list in request order
+    responses = data if isinstance(data, list) else [data]
+    return [parse_snapshot(d, forecast_days) for d in responses]
+
+
+def snapshot_to_payload(snapshot):
+    ##JSON-serializable form of a snapshot (NaN -> null); conditions are rebuilt on load
+    def series(block):
         return {
-            'condition': condition,
-            'temperature': temp,
-            'wind_speed': wind,
-            'hour': current_hour_index,
-            'description': description
+            name: np.datetime_as_string(values).tolist() if name == 'time'
+            else [None if v != v else v for v in np.asarray(values, dtype=float).tolist()]
+            for name, values in block.items() if name not in ('condition', 'day_index')
         }
 
+    payload = {
+        'utc_offset_seconds': snapshot.get('utc_offset_seconds'),
+        'hourly': series(snapshot['hourly']),
+        'daily': series(snapshot['daily']),
+    }
+    if snapshot.get('current'):
+        payload['current'] = {name: float(v) for name, v in snapshot['current'].items()}
+    return payload
+
+
+def snapshot_from_record(record):
+    ##Rebuilds a snapshot from a weather_store record, keeping its original timestamps
+    payload = record['payload']
+    snapshot = parse_snapshot(payload, record['forecast_days'])
+    snapshot['fetched_at'] = record['fetched_at']
+    snapshot['expires_at'] = record['expires_at']
+    if payload.get('current'):
+        snapshot['current'] = payload['current']
+    return snapshot
+
+
+def cached_snapshot(lat, lon, forecast_days=SNAPSHOT_DAYS):
+    ##Returns a fresh, long-enough snapshot from memory or (cold start) disk, else None
+    def usable(snapshot):
+        return (snapshot and time.time() < snapshot['expires_at']
+                and snapshot['forecast_days'] >= forecast_days)
+
+    with _snapshot_lock:
+        snapshot = _snapshot_cache.get((lat, lon))
+    if usable(snapshot):
+        return snapshot
+
+    record = weather_store.load(lat, lon)
+    if record and usable(record):
+        snapshot = snapshot_from_record(record)
+        store_snapshot(lat, lon, snapshot)
+        return snapshot
+    return None
+
+
+def store_snapshot(lat, lon, snapshot):
+    ##Publishes a snapshot to the shared in-memory cache
+    with _snapshot_lock:
+        _snapshot_cache[(lat, lon)] = snapshot
+
+
+def remember_snapshot(lat, lon, snapshot):
+    ##Publishes a freshly fetched snapshot to memory and to the disk store
+    store_snapshot(lat, lon, snapshot)
+    weather_store.save(
+        lat, lon, snapshot['fetched_at'], snapshot['expires_at'],
+        snapshot['forecast_days'], snapshot_to_payload(snapshot)
+    )
+
+
+def stored_snapshot(lat, lon, forecast_days: int = 0):
+    ##Newest snapshot of a location (memory, then disk) younger than WEATHER_STORE_MAX_AGE,
+    ##even if its hour is over; marked stale. None if there is none
+    with _snapshot_lock:
+        snapshot = _snapshot_cache.get((lat, lon))
+    if snapshot is None or time.time() - snapshot['fetched_at'] > WEATHER_STORE_MAX_AGE:
+        record = weather_store.load(lat, lon)
+        if record is None:
+            return None
+        snapshot = snapshot_from_record(record)
+        store_snapshot(lat, lon, snapshot)   # next lookups skip the disk
+    if snapshot['forecast_days'] < forecast_days:
+        return None
+    return dict(snapshot, stale=True)
+
+
+def fallback_snapshot(lat, lon):
+    ##Newest last-known-good snapshot after an upstream failure
+    ##It is served for WEATHER_STALE_RETRY seconds before retrying upstream
+    snapshot = stored_snapshot(lat, lon)
+    if snapshot is None:
+        return None
+
+    snapshot = dict(snapshot, expires_at=time.time() + WEATHER_STALE_RETRY)
+    store_snapshot(lat, lon, snapshot)
+    return snapshot
+
+
+def describe_age(fetched_at):
+    ##Human-readable age of served data ("updated 12 min ago")
+    if not fetched_at:
+        return ""
+    age = max(0, time.time() - fetched_at)
+    if age < 60:
+        return "updated just now"
+    if age < 3600:
+        return f"updated {int(age // 60)} min ago"
+    if age < 86400:
+        return f"updated {int(age // 3600)} h ago"
+    return f"updated {int(age // 86400)} d ago"
+
+
+def _claim_fetches(keys):
+    ##Single flight per location: returns (claimed, waiting), both {key: Future}
+    ##claimed: keys nobody was fetching, the caller must resolve them with _run_fetches
+    ##waiting: keys another thread is already fetching
+    claimed, waiting = {}, {}
+    with _snapshot_lock:
+        for key in keys:
+            future = _inflight.get(key)
+            if future is None:
+                future = _inflight[key] = Future()
+                claimed[key] = future
+            else:
+                waiting[key] = future
+    return claimed, waiting
+
+
+def _resolve_fetch(key, future, snapshot, error=None):
+    with _snapshot_lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+    if snapshot is None:
+        future.set_exception(error or RuntimeError(f"No weather data for {key[0]},{key[1]}"))
+    else:
+        future.set_result(snapshot)
+
+
+def _run_fetches(claimed):
+    ##Fetches the claimed (lat, lon, days) keys, up to MAX_LOCATIONS_PER_REQUEST per call,
+    ##and resolves their futures (last-known-good snapshot on failure, an error if none)
+    keys = list(claimed)
+    try:
+        for start in range(0, len(keys), MAX_LOCATIONS_PER_REQUEST):
+            chunk = keys[start:start + MAX_LOCATIONS_PER_REQUEST]
+            # Another caller may have published a snapshot since the cache check
+            todo = []
+            for key in chunk:
+                snapshot = cached_snapshot(*key)
+                if snapshot:
+                    _resolve_fetch(key, claimed[key], snapshot)
+                else:
+                    todo.append(key)
+            if not todo:
+                continue
+
+            error = None
+            try:
+                snapshots = fetch_snapshots(
+                    ",".join(str(lat) for lat, _lon, _days in todo),
+                    ",".join(str(lon) for _lat, lon, _days in todo),
+                    todo[0][2]
+                )
+            except Exception as e:
+                print(f"Weather API error, serving stored data: {e}")
+                snapshots = [fallback_snapshot(lat, lon) for lat, lon, _days in todo]
+                error = e
+            else:
+                for (lat, lon, _days), snapshot in zip(todo, snapshots):
+                    remember_snapshot(lat, lon, snapshot)
+            for key, snapshot in zip(todo, snapshots):
+                _resolve_fetch(key, claimed[key], snapshot, error)
+    finally:
+        # Never leave waiters blocked on a fetch that died half-way
+        for key, future in claimed.items():
+            if not future.done():
+                _resolve_fetch(key, future, None)
+
+
+def refresh_in_background(keys):
+    ##Fetches (lat, lon, days) keys on a daemon thread, skipping those already in flight
+    claimed, _waiting = _claim_fetches(keys)
+    if claimed:
+        threading.Thread(target=_run_fetches, args=(claimed,), name="weather-refresh", daemon=True).start()
+
+
+def get_weather_snapshot(forecast_days: int = SNAPSHOT_DAYS, lat: float = VIENNA_LAT, lon: float = VIENNA_LON):
+    ##Returns the cached snapshot for a location, refetching once per hour
+    ##Once the hour is over, the stored snapshot is served right away (marked stale)
+    ##while the upstream refresh runs in the background; only a location with
+    ##nothing stored waits for the upstream
+    ##Concurrent callers for the same location share one upstream fetch; other
+    ##locations are never blocked by it
+    ##Raises only when nothing usable is stored and the upstream fails
+    snapshot = cached_snapshot(lat, lon, forecast_days)
+    if snapshot:
+        return snapshot
+
+    key = (lat, lon, max(forecast_days, SNAPSHOT_DAYS))
+    snapshot = stored_snapshot(lat, lon, forecast_days)
+    if snapshot:
+        refresh_in_background([key])
+        return snapshot
+
+    claimed, waiting = _claim_fetches([key])
+    _run_fetches(claimed)
+    return (claimed or waiting)[key].result()
+
+
+def get_weather_snapshots(names=None, forecast_days: int = SNAPSHOT_DAYS):
+    ##Snapshots for many registered locations (default: all of them)
+    ##Expired ones with a stored snapshot are served stale and refreshed together in the
+    ##background; the others are fetched together, up to MAX_LOCATIONS_PER_REQUEST
+    ##coordinates per call (locations another caller is already fetching are awaited)
+    names = list(names) if names is not None else list(LOCATIONS)
+    coords = {name: get_location(name) for name in names}
+    snapshots = {}
+    keys = {}
+    refresh = []
+
+    days = max(forecast_days, SNAPSHOT_DAYS)
+    for name in names:
+        snapshot = cached_snapshot(*coords[name], forecast_days)
+        if snapshot is None:
+            snapshot = stored_snapshot(*coords[name], forecast_days)
+            if snapshot:
+                refresh.append((*coords[name], days))
+        if snapshot:
+            snapshots[name] = snapshot
+        else:
+            keys[name] = (*coords[name], days)
+    refresh_in_background(dict.fromkeys(refresh))
+
+    claimed, waiting = _claim_fetches(dict.fromkeys(keys.values()))
+    _run_fetches(claimed)
+    futures = {**waiting, **claimed}
+    for name, key in keys.items():
+        try:
+            snapshots[name] = futures[key].result()
+        except Exception as e:
+            print(f"Weather unavailable ({name}): {e}")
+
+    return {name: snapshots[name] for name in names if name in snapshots}
+
+
+def clear_weather_cache():
+    ##Drops every cached snapshot (next call goes upstream)
+    with _snapshot_lock:
+        _snapshot_cache.clear()
+
+
+# SNAPSHOT VIEWS
+# Pure functions shared by the sync API below and the async API in weather_async.py
+def offline_weather():
+    ##Fallback used when no weather data can be fetched
+    return {'condition': "Neutral", 'temperature': 15, 'wind_speed': 10, 'hour': 12, 'description': "Offline Mode"}
+
+
+def current_from_snapshot(snapshot):
+    ##Weather for the current hour
+    hourly = snapshot['hourly']
+
+    # Current hour, in the location's own timezone when known
+    offset = snapshot.get('utc_offset_seconds')
+    if offset is None:
+        now = datetime.datetime.now()
+    else:
+        now = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=offset)
+    current_hour_index = now.hour
+
+    # Position in the series (hours since its first timestamp), so stored
+    # snapshots from an earlier day still resolve to the right hour
+    series_index = current_hour_index
+    if len(hourly['time']):
+        now_local = np.datetime64(now.replace(tzinfo=None), 'm')
+        series_index = int((now_local - hourly['time'][0]) // np.timedelta64(1, 'h'))
+        if not 0 <= series_index < len(hourly['time']):
+            raise IndexError("Current hour is outside the stored forecast")
+
+    # Data extraction (condition is precomputed for the whole series)
+    current = snapshot.get('current')
+    if current and not snapshot.get('stale'):
+        condition = classify_weather_codes([current['weather_code']])[0]
+        temp = float(current['temperature_2m'])
+        wind = float(current['wind_speed_10m'])
+    else:
+        condition = hourly['condition'][series_index]
+        temp = _value_at(hourly['temperature_2m'], series_index)
+        wind = _value_at(hourly['wind_speed_10m'], series_index)
+
+    description = f"{condition} | {temp:.1f}°C | Wind {wind:.1f} km/h"
+
+    return {
+        'condition': condition,
+        'temperature': temp,
+        'wind_speed': wind,
+        'hour': current_hour_index,
+        'description': description,
+        'fetched_at': snapshot['fetched_at'],
+        'stale': snapshot.get('stale', False)
+    }
+
+
+def forecast_from_snapshot(snapshot, forecast_days=SNAPSHOT_DAYS):
+    ##Daily summary for the next days
+    daily = snapshot['daily']
+
+    dates = daily['time'][:forecast_days]
+    tmax = daily['temperature_2m_max']
+    tmin = daily['temperature_2m_min']
+    codes = daily['weather_code']
+    conditions = daily['condition']
+
+    forecast = []
+    for i, d in enumerate(dates):
+        forecast.append({
+            'date': str(d),
+            'max': _value_at(tmax, i),
+            'min': _value_at(tmin, i),
+            'weather_code': _code_at(codes, i),
+            'condition': conditions[i] if i < len(conditions) else 'Neutral',
+            'fetched_at': snapshot['fetched_at']
+        })
+
+    return forecast
+
+
+def hourly_slice(snapshot, date_str):
+    ##Hourly series of one date as array views (no copy, no scan)
+    series = snapshot['hourly']
+    start, stop = series['day_index'].get(date_str, (0, 0))
+    return {
+        name: values[start:stop]
+        for name, values in series.items() if name != 'day_index'
+    }
+
+
+def hourly_from_snapshot(snapshot, date_str):
+    ##Hours of a given date (YYYY-MM-DD)
+    day = hourly_slice(snapshot, date_str)
+
+    times = day['time']
+    temps = day['temperature_2m']
+    codes = day['weather_code']
+    winds = day['wind_speed_10m']
+
+    hourly = []
+    for i, t in enumerate(times):
+        hourly.append({
+            'time': str(t),
+            'temp': _value_at(temps, i),
+            'weather_code': _code_at(codes, i),
+            'wind': _value_at(winds, i)
+        })
+
+    return hourly
+
+
+# RETRIEVAL FUNCTION 
+def get_current_weather(location: str = None):
+    ##Retrieves weather and adds temporal details
+    try:
+        lat, lon = get_location(location)
+        return current_from_snapshot(get_weather_snapshot(lat=lat, lon=lon))
+    except Exception as e:
+        print(f"API Error: {e}")
+        return offline_weather()
+
+
+def get_current_weather_for_locations(names=None):
+    ##Current weather for many locations from one batched request
+    ##Returns: {name: weather_data} (Offline Mode entries for failed locations)
+    names = list(names) if names is not None else list(LOCATIONS)
+    try:
+        snapshots = get_weather_snapshots(names)
     except Exception as e:
         print(f"API Error: {e}")
-        return {'condition': "Neutral", 'temperature': 15, 'wind_speed': 10, 'hour': 12, 'description': "Offline Mode"}
+        snapshots = {}
+
+    weather = {}
+    for name in names:
+        try:
+            weather[name] = current_from_snapshot(snapshots[name])
+        except Exception as e:
+            print(f"API Error ({name}): {e}")
+            weather[name] = offline_weather()
+    return weather
 
 # SPOTIFY ALGORITHM 
 def map_weather_to_spotify(weather_data):
@@ -147,91 +759,136 @@ def map_weather_to_spotify(weather_data):
     }
 
 
-def get_forecast(forecast_days: int = 5):
-    ##Returns a list of data for the next days:
-    
-    params = {
-        "latitude": VIENNA_LAT,
-        "longitude": VIENNA_LON,
-        "daily": "temperature_2m_max,temperature_2m_min,weathercode",
-        "timezone": "auto",
-        "forecast_days": forecast_days
+# BATCH ALGORITHM
+# Columnar version of map_weather_to_spotify: same rules, applied to whole arrays
+# (e.g. a 7-day x 24-hour horizon) in one call.
+TIME_VIBES = ("Morning", "Day", "Evening", "Night")
+_TIME_VIBE_NAMES = np.array(TIME_VIBES, dtype=object)
+_REFERENCE_HOURS = (8, 14, 20, 2)
+_genre_table = None
+
+
+def _seed_genre_table():
+    ##(condition, time vibe) -> seed genres, derived from the scalar algorithm itself
+    global _genre_table
+    if _genre_table is None:
+        table = np.empty((len(CONDITIONS), len(TIME_VIBES)), dtype=object)
+        for c, condition in enumerate(CONDITIONS):
+            for v, hour in enumerate(_REFERENCE_HOURS):
+                params = map_weather_to_spotify(
+                    {'condition': condition, 'hour': hour, 'temperature': 15, 'wind_speed': 0}
+                )
+                table[c, v] = params["seed_genres"]
+        _genre_table = table
+    return _genre_table
+
+
+def map_weather_to_spotify_batch(condition, hour, temperature, wind):
+    ##Vectorized map_weather_to_spotify over columnar inputs
+    ##Returns the same keys with one array entry per input element
+    condition = np.asarray(condition, dtype=object)
+    hour = np.asarray(hour, dtype=float)
+    temp = np.asarray(to_float_array(temperature), dtype=float)
+    wind = np.asarray(to_float_array(wind), dtype=float)
+    n = len(condition)
+
+    # TEMPORAL LOGIC
+    vibe = np.full(n, 3, dtype=np.int8)
+    vibe[(5 <= hour) & (hour < 12)] = 0
+    vibe[(12 <= hour) & (hour < 18)] = 1
+    vibe[(19 <= hour) & (hour < 23)] = 2
+    morning, day, evening, night = (vibe == v for v in range(4))
+
+    target_valence = np.full(n, 0.5)
+    target_energy = np.full(n, 0.5)
+    target_tempo = np.full(n, 110.0)
+
+    target_energy[morning] -= 0.2
+    target_energy[day] += 0.2
+    target_energy[evening] -= 0.1
+    target_tempo[evening] -= 10
+    target_energy[night] = 0.4
+
+    # WEATHER LOGIC
+    cond = np.zeros(n, dtype=np.int8)
+    for c, name in enumerate(CONDITIONS):
+        cond[condition == name] = c
+    clear, cloudy, rain, snow, storm = (cond == CONDITIONS.index(name) for name in CONDITIONS[1:])
+
+    target_valence[clear] = 0.8
+    target_valence[cloudy] = 0.5
+    target_valence[rain] = 0.3
+    target_energy[rain] -= 0.1
+    target_valence[snow] = 0.6
+    target_energy[snow] = 0.3
+    target_tempo[snow] = 80
+    target_energy[storm] = 0.9
+    target_valence[storm] = 0.2
+
+    # MICRO-ADJUSTMENTS
+    windy = wind > 20
+    target_tempo[windy] += wind[windy] * 0.5
+    target_acousticness = np.where(temp < 5, 0.7, 0.2)
+
+    # Normalization
+    target_valence = np.clip(target_valence, 0, 1)
+    target_energy = np.clip(target_energy, 0, 1)
+
+    time_vibe = _TIME_VIBE_NAMES[vibe]
+    return {
+        "limit": 20,
+        "seed_genres": _seed_genre_table()[cond, vibe],
+        "target_valence": target_valence,
+        "target_energy": target_energy,
+        "target_tempo": target_tempo,
+        "target_acousticness": target_acousticness,
+        "_mood": condition + " " + time_vibe
     }
 
+
+def get_mood_timeline(days: int = 7):
+    ##Mood parameters for every forecast hour of the next days
+    ##Returns: dict of arrays (see map_weather_to_spotify_batch) plus 'time'
     try:
-        resp = requests.get(WEATHER_URL, params=params)
-        resp.raise_for_status()
-        data = resp.json()
-
-        dates = data.get('daily', {}).get('time', [])
-        tmax = data.get('daily', {}).get('temperature_2m_max', [])
-        tmin = data.get('daily', {}).get('temperature_2m_min', [])
-        codes = data.get('daily', {}).get('weathercode', [])
-
-        forecast = []
-        for i, d in enumerate(dates):
-            code = codes[i] if i < len(codes) else None
-            if code is None:
-                condition = 'Neutral'
-            elif code == 0:
-                condition = 'Clear'
-            elif code in [1,2,3]:
-                condition = 'Cloudy'
-            elif code in [51,53,55,56,57,61,63,65,66,67,80,81,82]:
-                condition = 'Rain'
-            elif code in [71,73,75,77,85,86]:
-                condition = 'Snow'
-            elif code in [95,96,99]:
-                condition = 'Thunderstorm'
-            else:
-                condition = 'Neutral'
+        hourly = get_weather_snapshot(days)['hourly']
+        count = min(days * 24, len(hourly['time']))
+        timeline = map_weather_to_spotify_batch(
+            hourly['condition'][:count],
+            np.arange(count) % 24,
+            hourly['temperature_2m'][:count],
+            hourly['wind_speed_10m'][:count]
+        )
+        timeline['time'] = hourly['time'][:count]
+        return timeline
+    except Exception as e:
+        print(f"Mood timeline error: {e}")
+        return {}
 
-            forecast.append({
-                'date': d,
-                'max': tmax[i] if i < len(tmax) else None,
-                'min': tmin[i] if i < len(tmin) else None,
-                'weather_code': code,
-                'condition': condition
-            })
 
-        return forecast
+def map_locations_to_spotify(names=None):
+    ##Runs the mood algorithm for many locations
+    ##Returns: {name: spotify_params}
+    return {
+        name: map_weather_to_spotify(weather)
+        for name, weather in get_current_weather_for_locations(names).items()
+    }
+
+
+def get_forecast(forecast_days: int = 5, location: str = None):
+    ##Returns a list of data for the next days:
+    try:
+        lat, lon = get_location(location)
+        return forecast_from_snapshot(get_weather_snapshot(forecast_days, lat, lon), forecast_days)
     except Exception as e:
         print(f"Forecast API error: {e}")
         return []
 
 
-def get_hourly_forecast(date_str: str, days: int = 5):
+def get_hourly_forecast(date_str: str, days: int = 5, location: str = None):
     ##Returns the list of hours for a given date (YYYY-MM-DD).
-    
-    params = {
-        "latitude": VIENNA_LAT,
-        "longitude": VIENNA_LON,
-        "hourly": "temperature_2m,weathercode,wind_speed_10m",
-        "timezone": "auto",
-        "forecast_days": days
-    }
-
     try:
-        resp = requests.get(WEATHER_URL, params=params)
-        resp.raise_for_status()
-        data = resp.json()
-
-        times = data.get('hourly', {}).get('time', [])
-        temps = data.get('hourly', {}).get('temperature_2m', [])
-        codes = data.get('hourly', {}).get('weathercode', [])
-        winds = data.get('hourly', {}).get('wind_speed_10m', [])
-
-        hourly = []
-        for i, t in enumerate(times):
-            if t.startswith(date_str):
-                hourly.append({
-                    'time': t,
-                    'temp': temps[i] if i < len(temps) else None,
-                    'weather_code': codes[i] if i < len(codes) else None,
-                    'wind': winds[i] if i < len(winds) else None
-                })
-
-        return hourly
+        lat, lon = get_location(location)
+        return hourly_from_snapshot(get_weather_snapshot(days, lat, lon), date_str)
     except Exception as e:
         print(f"Hourly forecast API error: {e}")
-        return []
\ No newline at end of file
+        return []
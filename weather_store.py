@@ -0,0 +1,70 @@
+# weather_store.py
+# Disk-backed last-known-good weather snapshots (SQLite, one row per location).
+# Every successful fetch is written here; it is read on cold start and whenever
+# the upstream API fails.
+import json
+import sqlite3
+import threading
+import time
+from config import WEATHER_STORE_PATH, WEATHER_STORE_MAX_AGE
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _get_connection():
+    ##Opens the store on first use (shared by all threads, guarded by _lock)
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(str(WEATHER_STORE_PATH), check_same_thread=False)
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " location TEXT PRIMARY KEY,"
+            " fetched_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " forecast_days INTEGER NOT NULL,"
+            " payload TEXT NOT NULL)"
+        )
+        _conn.commit()
+    return _conn
+
+
+def _location_key(lat, lon):
+    return f"{float(lat):.4f},{float(lon):.4f}"
+
+
+def save(lat, lon, fetched_at, expires_at, forecast_days, payload):
+    ##Replaces the stored snapshot of a location (payload must be JSON-serializable)
+    try:
+        with _lock:
+            conn = _get_connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                (_location_key(lat, lon), fetched_at, expires_at, forecast_days, json.dumps(payload))
+            )
+            conn.commit()
+    except Exception as e:
+        print(f"Weather store write error: {e}")
+
+
+def load(lat, lon, max_age: float = WEATHER_STORE_MAX_AGE):
+    ##Returns the stored record of a location if it is younger than max_age, else None
+    ##Record: {'fetched_at', 'expires_at', 'forecast_days', 'payload'}
+    try:
+        with _lock:
+            row = _get_connection().execute(
+                "SELECT fetched_at, expires_at, forecast_days, payload FROM snapshots WHERE location = ?",
+                (_location_key(lat, lon),)
+            ).fetchone()
+    except Exception as e:
+        print(f"Weather store read error: {e}")
+        return None
+
+    if row is None or time.time() - row[0] > max_age:
+        return None
+    return {
+        'fetched_at': row[0],
+        'expires_at': row[1],
+        'forecast_days': row[2],
+        'payload': json.loads(row[3]),
+    }